@@ -19,13 +19,11 @@ def fetch_example() -> dict:
 
 
 @sandbox(memory_mb=1024, timeout_sec=60, cpus=2)
-def heavy_computation(n: int) -> int:
+def sum_below(n: int) -> int:
     """Example with custom resource limits."""
-    # Simulate some heavy work
-    result = 0
-    for i in range(n):
-        result += i
-    return result
+    # Sum of 0..n-1 in closed form (0 for n < 1, like summing an empty range)
+    n = max(n, 0)
+    return n * (n - 1) // 2
 
 
 if __name__ == "__main__":
@@ -39,7 +37,7 @@ if __name__ == "__main__":
     print("fetch_example() would use requests library")
 
     print("\nWith custom resources:")
-    print("heavy_computation(1000) would run with 1GB RAM, 2 CPUs")
+    print("sum_below(1000) would run with 1GB RAM, 2 CPUs")
 
     print("\nFunction metadata:")
     print(f"Is sandboxed: {add_numbers._is_sandboxed}")
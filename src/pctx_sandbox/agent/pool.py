@@ -1,16 +1,53 @@
 """Warm sandbox pool for process isolation inside Podman container."""
 
 import asyncio
-import base64
+import collections
+import json
 import logging
+import struct
 import time
 from pathlib import Path
 from typing import Any
 
-import httpx
-
 logger = logging.getLogger(__name__)
 
+# Frame headers and result tags shared with worker.py
+HEADER = struct.Struct(">I")
+JOB_HEADER = struct.Struct(">III")
+RESULT_HEADER = struct.Struct(">cI")
+RESULT_MSGPACK = b"M"
+RESULT_PICKLE = b"P"
+RESULT_ERROR = b"E"
+
+# Most recent stderr chunks kept per worker for error reports (bounded at ~64KB)
+STDERR_TAIL_CHUNKS = 16
+STDERR_CHUNK_SIZE = 4096
+
+# Starts a worker by importing worker.py (whose directory is passed as argv[1])
+# rather than running it as a script, so its bytecode is cached in __pycache__
+# instead of being recompiled by every new worker process
+WORKER_BOOTSTRAP = "import sys; sys.path.insert(0, sys.argv[1]); import worker; worker.main()"
+
+# Allowance on top of each job's timeout for moving its frames over the pipes
+IPC_GRACE_SEC = 1.0
+
+
+def _decode_result(tag: bytes, data: bytes) -> dict[str, Any]:
+    """Turn a worker result frame into the agent's result dictionary.
+
+    Args:
+        tag: Result tag from the frame header
+        data: Frame payload
+
+    Returns:
+        Result dictionary
+    """
+    if tag == RESULT_MSGPACK:
+        return {"error": False, "result_msgpack": data}
+    if tag == RESULT_PICKLE:
+        return {"error": False, "result_pickle": data}
+    return json.loads(data)
+
 
 class SandboxWorker:
     """A single warm worker process (container provides isolation)."""
@@ -36,7 +73,8 @@ class SandboxWorker:
         self.cpus = cpus
 
         self.process: asyncio.subprocess.Process | None = None
-        self.worker_url: str | None = None  # HTTP URL of worker (e.g., http://127.0.0.1:12345)
+        self._stderr_tail: collections.deque[bytes] = collections.deque(maxlen=STDERR_TAIL_CHUNKS)
+        self._stderr_task: asyncio.Task | None = None
         self.is_healthy = True
         self.is_busy = False
         self.jobs_executed = 0
@@ -47,10 +85,9 @@ class SandboxWorker:
         """Start the worker process and wait for it to be ready.
 
         This method:
-        1. Spawns Python process running worker.py HTTP server via uvx
-        2. Waits for worker to write "READY:PORT" to stdout
-        3. Verifies worker is healthy with HTTP health check
-        4. Returns only when worker is definitely ready to accept jobs
+        1. Spawns Python process importing worker.py with stdin/stdout pipes
+        2. Waits for worker to write "READY" to stdout once its imports are done
+        3. Returns only when worker is definitely ready to accept jobs
         """
         # Get worker script path
         worker_script = Path(__file__).parent / "worker.py"
@@ -59,21 +96,25 @@ class SandboxWorker:
 
         cmd = [
             str(self.python_bin),
-            str(worker_script),
+            "-c",
+            WORKER_BOOTSTRAP,
+            str(worker_script.parent),
         ]
         logger.debug(f"Worker {self.worker_id}: starting with command: {' '.join(cmd)}")
 
-        # Start the process
+        # Start the process; jobs and results travel over its stdin/stdout. Keep
+        # this free of preexec_fn, user/group and umask options: without them
+        # CPython (3.10+) spawns with vfork, so the agent's memory is never
+        # copy-on-write marked no matter how large its RSS grows.
         self.process = await asyncio.create_subprocess_exec(
             *cmd,
-            stdin=asyncio.subprocess.DEVNULL,  # Worker doesn't need stdin for HTTP mode
+            stdin=asyncio.subprocess.PIPE,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
         )
         logger.debug(f"Worker {self.worker_id}: process started with PID {self.process.pid}")
 
-        # Wait for worker to signal readiness with port number
-        # This blocks until worker has actually started HTTP server
+        # Wait for worker to signal readiness
         if not self.process.stdout:
             raise RuntimeError(f"Worker {self.worker_id} stdout is None")
 
@@ -88,9 +129,8 @@ class SandboxWorker:
                 f"Worker {self.worker_id} did not signal readiness within 10 seconds"
             ) from e
 
-        # Parse "READY:PORT\n"
         ready_text = ready_line.decode().strip()
-        if not ready_text.startswith("READY:"):
+        if ready_text != "READY":
             # Read stderr to understand what went wrong
             stderr_output = ""
             if self.process and self.process.stderr:
@@ -112,40 +152,56 @@ class SandboxWorker:
                 f"stderr: {stderr_output}"
             )
 
-        port = int(ready_text.split(":")[1])
-        self.worker_url = f"http://127.0.0.1:{port}"
-        logger.debug(f"Worker {self.worker_id}: ready on {self.worker_url}")
+        # Keep reading stderr (where job output goes) so a chatty job never
+        # blocks on a full pipe; only the tail is kept for error reports
+        self._stderr_task = asyncio.create_task(self._drain_stderr())
 
-        # Verify with health check (with retries for robustness)
-        max_health_retries = 3
-        for attempt in range(max_health_retries):
-            try:
-                async with httpx.AsyncClient(timeout=2.0) as client:
-                    response = await client.get(f"{self.worker_url}/health")
-                    if response.status_code != 200:
-                        raise RuntimeError(
-                            f"Health check failed with status {response.status_code}"
-                        )
-                    logger.debug(f"Worker {self.worker_id}: health check passed")
-                    break  # Success!
-            except httpx.ConnectError as e:
-                if attempt < max_health_retries - 1:
-                    # Exponential backoff: 0.1s, 0.2s
-                    await asyncio.sleep(0.1 * (2**attempt))
-                    continue
-                # Final attempt failed
-                await self.shutdown()
-                raise RuntimeError(
-                    f"Worker {self.worker_id} health check failed after {max_health_retries} attempts: {e}"
-                ) from e
-            except Exception as e:
-                await self.shutdown()
-                raise RuntimeError(f"Worker {self.worker_id} health check failed: {e}") from e
+        logger.debug(f"Worker {self.worker_id}: ready")
+
+    async def _drain_stderr(self) -> None:
+        """Read the worker's stderr until it closes, keeping only the most recent output."""
+        assert self.process and self.process.stderr
+        while chunk := await self.process.stderr.read(STDERR_CHUNK_SIZE):
+            self._stderr_tail.append(chunk)
+
+    def stderr_tail(self) -> str:
+        """Get the most recent stderr output from the worker.
+
+        Returns:
+            Up to about 64KB of the latest stderr text
+        """
+        return b"".join(self._stderr_tail).decode("utf-8", errors="replace")
+
+    async def _send(self, jobs: list[dict[str, Any]]) -> None:
+        """Send one request frame carrying a batch of jobs to the worker.
+
+        Args:
+            jobs: Job dicts with fn_pickle, args_pickle and kwargs_pickle
+        """
+        assert self.process and self.process.stdin
+        parts = [HEADER.pack(len(jobs))]
+        for job in jobs:
+            pickles = (job["fn_pickle"], job["args_pickle"], job["kwargs_pickle"])
+            parts.append(JOB_HEADER.pack(*map(len, pickles)))
+            parts.extend(pickles)
+        self.process.stdin.writelines(parts)
+        await self.process.stdin.drain()
+
+    async def _read_frame(self) -> tuple[bytes, bytes]:
+        """Read the next result frame from the worker.
+
+        Returns:
+            (tag, payload) of the frame
+        """
+        assert self.process and self.process.stdout
+        header = await self.process.stdout.readexactly(RESULT_HEADER.size)
+        tag, length = RESULT_HEADER.unpack(header)
+        return tag, await self.process.stdout.readexactly(length)
 
     async def execute(
         self, fn_pickle: bytes, args_pickle: bytes, kwargs_pickle: bytes, timeout_sec: int
     ) -> dict[str, Any]:
-        """Execute a job on this worker via HTTP.
+        """Execute a job on this worker over its stdin/stdout pipes.
 
         Args:
             fn_pickle: Pickled function
@@ -156,50 +212,88 @@ class SandboxWorker:
         Returns:
             Result dictionary
         """
-        if not self.worker_url:
+        job = {
+            "fn_pickle": fn_pickle,
+            "args_pickle": args_pickle,
+            "kwargs_pickle": kwargs_pickle,
+            "timeout_sec": timeout_sec,
+        }
+        (result,) = await self.execute_batch([job])
+        return result
+
+    async def execute_batch(self, jobs: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Execute several jobs back to back in one round trip to this worker.
+
+        Args:
+            jobs: Job dicts with fn_pickle, args_pickle, kwargs_pickle and timeout_sec
+
+        Returns:
+            One result dictionary per job, in order
+        """
+        if not self.process:
             raise RuntimeError(f"Worker {self.worker_id} not started")
 
+        # A pool that claimed this worker keeps the claim until its whole batch is done
+        was_busy = self.is_busy
         self.is_busy = True
         self.last_used_at = time.time()
 
+        frames: list[tuple[bytes, bytes]] = []
+
         try:
-            logger.debug(f"Worker {self.worker_id}: executing job with timeout {timeout_sec}s")
-
-            # Prepare HTTP request payload
-            payload = {
-                "fn_pickle": base64.b64encode(fn_pickle).decode("ascii"),
-                "args_pickle": base64.b64encode(args_pickle).decode("ascii"),
-                "kwargs_pickle": base64.b64encode(kwargs_pickle).decode("ascii"),
-            }
-
-            # Send HTTP POST to worker
-            async with httpx.AsyncClient(timeout=timeout_sec + 5) as client:
-                response = await client.post(
-                    f"{self.worker_url}/execute",
-                    json=payload,
-                    timeout=timeout_sec + 5,  # Add buffer for HTTP overhead
+            logger.debug(f"Worker {self.worker_id}: executing {len(jobs)} job(s)")
+
+            # Send the batch over the worker's stdin, then read one result frame per
+            # job; jobs run one after another, so each gets its own deadline
+            # counted from when the previous one finished
+            await self._send(jobs)
+            for job in jobs:
+                frames.append(
+                    await asyncio.wait_for(
+                        self._read_frame(), timeout=job["timeout_sec"] + IPC_GRACE_SEC
+                    )
                 )
 
-            # Parse response
-            result = response.json()
+            # Results arrive as raw msgpack or pickle bytes
+            # (don't decode here - let the caller handle that)
+            results = [_decode_result(tag, data) for tag, data in frames]
 
-            # Convert result_pickle from base64 string to bytes
-            # (don't unpickle here - let the caller handle that)
-            if not result.get("error") and "result_pickle" in result:
-                result["result_pickle"] = base64.b64decode(result["result_pickle"])
+            self.jobs_executed += len(jobs)
+            logger.debug(f"Worker {self.worker_id}: {len(jobs)} job(s) completed")
+            return results
 
-            self.jobs_executed += 1
-            logger.debug(f"Worker {self.worker_id}: job completed")
-            return result
+        except asyncio.TimeoutError:
+            # The reply may still arrive later and desync the pipe, so retire the worker
+            self.is_healthy = False
+            overran = len(frames)
+            self.jobs_executed += overran + 1
+            logger.warning(
+                f"Worker {self.worker_id}: job {overran + 1}/{len(jobs)} exceeded "
+                f"{jobs[overran]['timeout_sec']}s timeout"
+            )
 
-        except (httpx.TimeoutException, httpx.ReadTimeout, httpx.WriteTimeout, httpx.PoolTimeout):
+            # Keep the results that came back; jobs queued behind the hung one never ran
+            return [
+                *(_decode_result(tag, data) for tag, data in frames),
+                {
+                    "error": True,
+                    "error_type": "Timeout",
+                    "error_message": f"Execution exceeded {jobs[overran]['timeout_sec']}s timeout",
+                },
+                *(
+                    {
+                        "error": True,
+                        "error_type": "WorkerUnresponsive",
+                        "error_message": "Not run: an earlier job in its batch timed out",
+                    }
+                    for _ in jobs[overran + 1 :]
+                ),
+            ]
+        except asyncio.CancelledError:
+            # Abandoned mid round trip; a late reply would desync the pipe
             self.is_healthy = False
-            return {
-                "error": True,
-                "error_type": "Timeout",
-                "error_message": f"Execution exceeded {timeout_sec}s timeout",
-            }
-        except (httpx.ConnectError, httpx.RemoteProtocolError) as e:
+            raise
+        except (asyncio.IncompleteReadError, BrokenPipeError, ConnectionResetError) as e:
             self.is_healthy = False
 
             # Check if worker process is actually dead
@@ -212,38 +306,36 @@ class SandboxWorker:
                     process_status = "alive"
 
             logger.error(
-                f"Worker {self.worker_id} connection failed: {e} "
-                f"(process status: {process_status}, url: {self.worker_url})"
+                f"Worker {self.worker_id} pipe closed: {e!r} (process status: {process_status})\n"
+                f"stderr tail:\n{self.stderr_tail()}"
             )
 
-            return {
-                "error": True,
-                "error_type": "WorkerDied",
-                "error_message": f"Worker process terminated or connection refused (process: {process_status})",
-            }
+            return [
+                {
+                    "error": True,
+                    "error_type": "WorkerDied",
+                    "error_message": f"Worker process terminated or closed its pipe (process: {process_status})",
+                }
+                for _ in jobs
+            ]
         except Exception as e:
             self.is_healthy = False
             logger.error(f"Worker {self.worker_id} error: {e}")
 
-            # Try to get stderr from process
-            if self.process and self.process.stderr:
-                try:
-                    stderr_data = await asyncio.wait_for(
-                        self.process.stderr.read(10000), timeout=0.1
-                    )
-                    if stderr_data:
-                        stderr_text = stderr_data.decode("utf-8", errors="replace")
-                        logger.error(f"Worker stderr:\n{stderr_text}")
-                except Exception:
-                    pass
-
-            return {
-                "error": True,
-                "error_type": type(e).__name__,
-                "error_message": str(e),
-            }
+            stderr_text = self.stderr_tail()
+            if stderr_text:
+                logger.error(f"Worker stderr:\n{stderr_text}")
+
+            return [
+                {
+                    "error": True,
+                    "error_type": type(e).__name__,
+                    "error_message": str(e),
+                }
+                for _ in jobs
+            ]
         finally:
-            self.is_busy = False
+            self.is_busy = was_busy
 
     async def shutdown(self) -> None:
         """Gracefully shutdown the worker."""
@@ -262,6 +354,9 @@ class SandboxWorker:
             except Exception:
                 pass
 
+        if self._stderr_task:
+            self._stderr_task.cancel()
+
     def age_seconds(self) -> float:
         """Get worker age in seconds."""
         return time.time() - self.created_at
@@ -342,12 +437,16 @@ class WarmSandboxPool:
         # Start background management task
         self._management_task = asyncio.create_task(self._manage_pool())
 
-    async def _create_worker(self, memory_mb: int = 1024, cpus: int = 1) -> SandboxWorker:
+    async def _create_worker(
+        self, memory_mb: int = 1024, cpus: int = 1, claim: bool = False
+    ) -> SandboxWorker:
         """Create and start a new worker.
 
         Args:
             memory_mb: Memory limit
             cpus: CPU count
+            claim: Add the worker to the pool already marked busy, so no
+                other batch can take it before the caller uses it
 
         Returns:
             Started worker
@@ -361,32 +460,42 @@ class WarmSandboxPool:
         self.next_worker_id += 1
 
         await worker.start()
+        worker.is_busy = claim
         self.workers.append(worker)
 
         return worker
 
-    async def _get_worker(self) -> SandboxWorker | None:
-        """Get an available worker from the pool.
+    def has_idle_worker(self) -> bool:
+        """Check whether a healthy worker is free to take a job right now.
+
+        Returns:
+            True if at least one healthy worker is idle
+        """
+        return any(w.is_healthy and not w.is_busy for w in self.workers)
+
+    def _claim_idle_workers(self, limit: int) -> list[SandboxWorker]:
+        """Mark up to limit healthy, idle workers busy and return them.
+
+        Args:
+            limit: Maximum number of workers to claim
 
         Returns:
-            Available worker or None if all busy
+            Claimed workers (empty if all busy)
         """
-        # Find healthy, non-busy worker
+        claimed = []
         for worker in self.workers:
+            if len(claimed) == limit:
+                break
             if worker.is_healthy and not worker.is_busy:
-                logger.debug(
-                    f"Found available worker {worker.worker_id} "
-                    f"(age: {time.time() - worker.created_at:.1f}s, "
-                    f"jobs: {worker.jobs_executed})"
-                )
-                return worker
+                worker.is_busy = True
+                claimed.append(worker)
 
         logger.debug(
-            f"No available workers (total: {len(self.workers)}, "
+            f"Claimed {len(claimed)} worker(s) (total: {len(self.workers)}, "
             f"healthy: {sum(1 for w in self.workers if w.is_healthy)}, "
             f"busy: {sum(1 for w in self.workers if w.is_busy)})"
         )
-        return None
+        return claimed
 
     async def execute(
         self,
@@ -410,34 +519,81 @@ class WarmSandboxPool:
         Returns:
             Result dictionary
         """
-        # Try to get an available worker
-        worker = await self._get_worker()
+        job = {
+            "fn_pickle": fn_pickle,
+            "args_pickle": args_pickle,
+            "kwargs_pickle": kwargs_pickle,
+            "timeout_sec": timeout_sec,
+        }
+        (result,) = await self.execute_batch([job], memory_mb=memory_mb, cpus=cpus)
+        return result
+
+    async def execute_batch(
+        self, jobs: list[dict[str, Any]], memory_mb: int = 1024, cpus: int = 1
+    ) -> list[dict[str, Any]]:
+        """Execute a batch of jobs, split across the workers that are idle right now.
+
+        Each claimed worker runs its share back to back in a single round trip.
+        Workers are claimed before the first await, and an ad-hoc worker joins
+        the pool already claimed, so concurrent batches never share a worker.
+
+        Args:
+            jobs: Job dicts with fn_pickle, args_pickle, kwargs_pickle and timeout_sec
+            memory_mb: Memory limit (for ad-hoc workers)
+            cpus: CPU count (for ad-hoc workers)
+
+        Returns:
+            One result dictionary per job, in order
+        """
+        workers = self._claim_idle_workers(len(jobs))
 
         # If no workers available, create an ad-hoc one
-        if worker is None:
+        if not workers:
             logger.info(
                 f"No workers available in pool, creating ad-hoc worker "
                 f"(memory={memory_mb}MB, cpus={cpus})"
             )
             try:
-                worker = await self._create_worker(memory_mb=memory_mb, cpus=cpus)
+                workers = [await self._create_worker(memory_mb=memory_mb, cpus=cpus, claim=True)]
             except Exception as e:
                 logger.error(f"Failed to create ad-hoc worker: {e}")
-                return {
-                    "error": True,
-                    "error_type": "WorkerCreationFailed",
-                    "error_message": f"Failed to create worker: {e}",
-                }
+                return [
+                    {
+                        "error": True,
+                        "error_type": "WorkerCreationFailed",
+                        "error_message": f"Failed to create worker: {e}",
+                    }
+                    for _ in jobs
+                ]
+
+        # Split into contiguous chunks so results come back in job order
+        size, extra = divmod(len(jobs), len(workers))
+        chunks = []
+        start = 0
+        for i in range(len(workers)):
+            end = start + size + (1 if i < extra else 0)
+            chunks.append(jobs[start:end])
+            start = end
 
-        # Execute the job
-        result = await worker.execute(fn_pickle, args_pickle, kwargs_pickle, timeout_sec)
+        try:
+            chunk_results = await asyncio.gather(
+                *(
+                    worker.execute_batch(chunk)
+                    for worker, chunk in zip(workers, chunks, strict=True)
+                )
+            )
+        finally:
+            # Release claims even if a chunk was cancelled before it started
+            for worker in workers:
+                worker.is_busy = False
 
         # Replace unhealthy workers immediately (not as background task)
-        if not worker.is_healthy:
-            # Don't wait for replacement - do it in background but ensure it happens
-            asyncio.create_task(self._replace_worker(worker))
+        for worker in workers:
+            if not worker.is_healthy:
+                # Don't wait for replacement - do it in background but ensure it happens
+                asyncio.create_task(self._replace_worker(worker))
 
-        return result
+        return [result for results in chunk_results for result in results]
 
     async def _replace_worker(self, worker: SandboxWorker) -> None:
         """Replace an unhealthy or expired worker.
@@ -4,8 +4,13 @@ This agent provides sandboxing using Podman containers with warm process pools f
 """
 
 import asyncio
+import collections
+import contextlib
 import hashlib
+import shutil
+import subprocess
 import sys
+from collections.abc import AsyncIterator
 from pathlib import Path
 from typing import Any
 
@@ -18,7 +23,63 @@ try:
 except ImportError:
     from pool import WarmSandboxPool  # type: ignore[no-redef]
 
-app = FastAPI()
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Warm the pool for dependency-free functions at startup and stop every pool on exit.
+
+    The first call to a function without dependencies then skips starting
+    workers on its critical path.
+    """
+    import logging
+
+    try:
+        await executor._ensure_pool(NO_DEPS_HASH, None)
+    except Exception as e:
+        logging.getLogger(__name__).warning(f"Could not pre-warm the default pool: {e}")
+
+    yield
+
+    await executor.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Written into a venv once its packages are installed; a venv without it is a
+# leftover from a failed or interrupted build
+VENV_COMPLETE_MARKER = ".pctx-complete"
+
+# uv executable, looked up on PATH once rather than by every venv build
+UV_BIN = shutil.which("uv") or "uv"
+
+# Venvs link to the interpreter that built them and outlive image rebuilds on the
+# cache volume, so their names carry its version; one built by another Python is
+# never reused, and is pruned at start
+VENV_PYTHON_TAG = f"py{sys.version_info.major}.{sys.version_info.minor}"
+
+# Name prefix for venvs built with caching disabled; each is used by a single
+# decorated function, so they are dropped when the agent restarts
+NO_CACHE_VENV_PREFIX = "venv-nocache-"
+
+# The dep_hash the decorator sends for an empty dependency list
+NO_DEPS_HASH = hashlib.sha256(b"").hexdigest()[:16]
+
+# Most pools stopped at once when the agent shuts down
+POOL_SHUTDOWN_CONCURRENCY = 8
+
+
+class AgentBusyError(RuntimeError):
+    """Raised when a job arrives while its dependency set's queue is full."""
+
+
+def _run_uv(*args: str) -> subprocess.CompletedProcess[bytes]:
+    """Run uv to completion and capture its output.
+
+    Venv builds call this through asyncio.to_thread. A one-shot command
+    needs no asyncio child watcher, and capture_output drains both pipes
+    while uv runs, so a chatty install cannot fill a pipe and stall.
+    """
+    return subprocess.run([UV_BIN, *args], capture_output=True, check=False)
 
 
 class SimpleExecutor:
@@ -28,22 +89,48 @@ class SimpleExecutor:
         self,
         cache_dir: Path = Path("/tmp/pctx-cache"),
         pool_size: int = 3,
+        max_batch: int = 16,
+        batch_window_ms: float = 5.0,
+        consumers: int | None = None,
+        max_pools: int = 8,
     ) -> None:
         """Initialize executor.
 
         Args:
             cache_dir: Directory for dependency caches
             pool_size: Number of warm workers to maintain per venv (default: 3)
+            max_batch: Most jobs dispatched to the pool together (default: 16)
+            batch_window_ms: How long a batch waits for more jobs while every
+                worker is busy (default: 5ms)
+            consumers: Batches in flight at once per venv (default: pool_size)
+            max_pools: Warm pools kept at once; the least recently used idle pool
+                is shut down to make room for a new one (default: 8)
         """
         self.cache_dir = cache_dir
         self.cache_dir.mkdir(parents=True, exist_ok=True)
-        self.dep_envs: dict[str, Path] = {}
+        # Venv builds per dependency hash; concurrent first requests share one build
+        self.dep_envs: dict[str, asyncio.Future[Path]] = {}
 
-        # Pools per dependency hash
-        self.pools: dict[str, WarmSandboxPool] = {}
+        # Pools per dependency hash, least recently used first
+        self.pools: collections.OrderedDict[str, WarmSandboxPool] = collections.OrderedDict()
         self.pool_size = pool_size
+        self.max_pools = max_pools
+        self.pool_hits = 0
+        self.pool_misses = 0
+        self.pool_evictions = 0
+        # Pool starts in progress per dependency hash; concurrent first requests share one
+        self._pool_starts: dict[str, asyncio.Future[WarmSandboxPool]] = {}
+        # Jobs accepted and not yet finished per dependency hash; only idle pools are evicted
+        self._active_jobs: collections.Counter[str] = collections.Counter()
         self.platform = sys.platform
 
+        # Pending jobs and the consumers that batch and run them, per dependency hash
+        self.max_batch = max_batch
+        self.batch_window_sec = batch_window_ms / 1000
+        self._queues: dict[str, asyncio.Queue[tuple[dict[str, Any], asyncio.Future]]] = {}
+        self.consumers = consumers or pool_size
+        self._consumer_tasks: dict[str, list[asyncio.Task]] = {}
+
     async def execute(
         self,
         fn_pickle: bytes,
@@ -54,6 +141,8 @@ class SimpleExecutor:
         timeout_sec: int = 30,
         memory_mb: int = 1024,
         cpus: int = 1,
+        no_cache: bool = False,
+        wait_for_slot: bool = False,
     ) -> dict[str, Any]:
         """Execute a function in an isolated process using warm pool.
 
@@ -66,32 +155,155 @@ class SimpleExecutor:
             timeout_sec: Execution timeout
             memory_mb: Memory limit
             cpus: CPU count
+            no_cache: Install dependencies without uv's package cache
+            wait_for_slot: Wait for a free queue slot instead of refusing the job
+                when the queue is full
 
         Returns:
             Result dictionary
+
+        Raises:
+            AgentBusyError: If the queue for this dependency set is full and
+                wait_for_slot is not set
         """
-        # Ensure dependencies are installed using uv
-        venv_path = await self._ensure_venv(dep_hash, dependencies)
-
-        # Get or create pool for this dependency set
-        pool = await self._ensure_pool(dep_hash, venv_path)
-
-        # Execute using the warm pool
-        return await pool.execute(
-            fn_pickle=fn_pickle,
-            args_pickle=args_pickle,
-            kwargs_pickle=kwargs_pickle,
-            timeout_sec=timeout_sec,
-            memory_mb=memory_mb,
-            cpus=cpus,
-        )
+        self._active_jobs[dep_hash] += 1
+        try:
+            # Ensure dependencies are installed using uv
+            venv_path = await self._ensure_venv(dep_hash, dependencies, no_cache=no_cache)
+
+            # Get or create pool for this dependency set
+            pool = await self._ensure_pool(dep_hash, venv_path)
+
+            # Queue the job for this dependency set's consumers and wait for its result.
+            # The queue holds one full batch per consumer and no more: queuing faster
+            # than the consumers can take jobs gains nothing, so overflow is refused
+            # and the client backs off instead of work piling up in the agent.
+            queue = self._queues.get(dep_hash)
+            if queue is None:
+                queue = self._queues[dep_hash] = asyncio.Queue(
+                    maxsize=self.consumers * self.max_batch
+                )
+                self._consumer_tasks[dep_hash] = [
+                    asyncio.create_task(self._consume(pool, queue)) for _ in range(self.consumers)
+                ]
+
+            job = {
+                "fn_pickle": fn_pickle,
+                "args_pickle": args_pickle,
+                "kwargs_pickle": kwargs_pickle,
+                "timeout_sec": timeout_sec,
+                "memory_mb": memory_mb,
+                "cpus": cpus,
+            }
+            future = asyncio.get_running_loop().create_future()
+            if wait_for_slot:
+                await queue.put((job, future))
+            else:
+                try:
+                    queue.put_nowait((job, future))
+                except asyncio.QueueFull:
+                    raise AgentBusyError(
+                        f"All {queue.maxsize} queue slots for this environment are taken"
+                    ) from None
+            return await future
+        finally:
+            self._active_jobs[dep_hash] -= 1
+            if not self._active_jobs[dep_hash]:
+                del self._active_jobs[dep_hash]
+
+    async def _consume(
+        self,
+        pool: WarmSandboxPool,
+        queue: asyncio.Queue[tuple[dict[str, Any], asyncio.Future]],
+    ) -> None:
+        """Repeatedly take a batch off the queue and run it to completion.
+
+        Each consumer has at most one batch in flight, so the number of
+        consumers bounds how much work is handed to the pool at once.
+
+        Args:
+            pool: Pool for this dependency set
+            queue: Jobs paired with the futures awaiting their results
+        """
+        while True:
+            batch = await self._next_batch(pool, queue)
+            await self._run_batch(pool, batch)
 
-    async def _ensure_venv(self, dep_hash: str, dependencies: list[str]) -> Path | None:
+    async def _next_batch(
+        self,
+        pool: WarmSandboxPool,
+        queue: asyncio.Queue[tuple[dict[str, Any], asyncio.Future]],
+    ) -> list[tuple[dict[str, Any], asyncio.Future]]:
+        """Coalesce queued jobs into a batch.
+
+        A batch takes everything already queued, up to max_batch. While every
+        worker is busy it also waits up to batch_window_sec for more jobs, since
+        they would have to wait for a worker anyway.
+
+        Args:
+            pool: Pool for this dependency set
+            queue: Jobs paired with the futures awaiting their results
+
+        Returns:
+            Jobs paired with their futures
+        """
+        loop = asyncio.get_running_loop()
+        batch = [await queue.get()]
+        deadline = loop.time() + self.batch_window_sec
+
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+
+            remaining = deadline - loop.time()
+            if remaining <= 0 or pool.has_idle_worker():
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run_batch(
+        self,
+        pool: WarmSandboxPool,
+        batch: list[tuple[dict[str, Any], asyncio.Future]],
+    ) -> None:
+        """Execute a batch on the pool and resolve each job's future.
+
+        Args:
+            pool: Pool for this dependency set
+            batch: Jobs paired with the futures awaiting their results
+        """
+        jobs = [job for job, _ in batch]
+        try:
+            results = await pool.execute_batch(
+                jobs, memory_mb=jobs[0]["memory_mb"], cpus=jobs[0]["cpus"]
+            )
+        except Exception as e:
+            results = [
+                {"error": True, "error_type": type(e).__name__, "error_message": str(e)}
+                for _ in jobs
+            ]
+
+        for (_, future), result in zip(batch, results, strict=True):
+            # Skip callers that went away while the batch ran
+            if not future.done():
+                future.set_result(result)
+
+    async def _ensure_venv(
+        self, dep_hash: str, dependencies: list[str], no_cache: bool = False
+    ) -> Path | None:
         """Ensure virtual environment with dependencies exists using uv.
 
         Args:
             dep_hash: Hash of dependencies
             dependencies: List of pip packages
+            no_cache: Install dependencies without uv's package cache
 
         Returns:
             Path to venv or None if no dependencies
@@ -99,68 +311,110 @@ class SimpleExecutor:
         if not dependencies:
             return None
 
-        if dep_hash in self.dep_envs:
-            return self.dep_envs[dep_hash]
+        build = self.dep_envs.get(dep_hash)
+        if build is None:
+            build = asyncio.ensure_future(
+                self._build_venv(dep_hash, dependencies, no_cache=no_cache)
+            )
+            self.dep_envs[dep_hash] = build
+
+        try:
+            # Shielded so a caller that goes away does not cancel the build for the others
+            return await asyncio.shield(build)
+        except Exception:
+            # Let the next request retry a failed build
+            if self.dep_envs.get(dep_hash) is build:
+                del self.dep_envs[dep_hash]
+            raise
+
+    async def _build_venv(
+        self, dep_hash: str, dependencies: list[str], no_cache: bool = False
+    ) -> Path:
+        """Create a virtual environment with dependencies using uv.
 
-        venv_path = self.cache_dir / f"venv-{dep_hash}"
+        Args:
+            dep_hash: Hash of dependencies
+            dependencies: List of pip packages
+            no_cache: Install dependencies without uv's package cache
 
-        # If venv already exists on disk, reuse it
-        if venv_path.exists() and (venv_path / "bin" / "python").exists():
-            self.dep_envs[dep_hash] = venv_path
+        Returns:
+            Path to venv
+        """
+        if no_cache:
+            venv_path = self.cache_dir / f"{NO_CACHE_VENV_PREFIX}{VENV_PYTHON_TAG}-{dep_hash}"
+        else:
+            venv_path = self.cache_dir / f"venv-{VENV_PYTHON_TAG}-{dep_hash}"
+
+        # If a complete venv already exists on disk, reuse it
+        if (venv_path / VENV_COMPLETE_MARKER).exists():
             return venv_path
 
-        import logging
+        # Start over from anything a failed or interrupted build left behind
+        shutil.rmtree(venv_path, ignore_errors=True)
 
-        logger = logging.getLogger(__name__)
-        logger.info(f"Creating venv at {venv_path} with Python {sys.executable}")
+        try:
+            await self._install_venv(venv_path, dependencies, no_cache=no_cache)
+        except BaseException:
+            shutil.rmtree(venv_path, ignore_errors=True)
+            raise
 
-        proc = await asyncio.create_subprocess_exec(
-            "uv",
-            "venv",
-            "--python",
-            sys.executable,
-            str(venv_path),
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-        )
-        returncode = await proc.wait()
-        stdout_data = await proc.stdout.read() if proc.stdout else b""
-        stderr_data = await proc.stderr.read() if proc.stderr else b""
+        (venv_path / VENV_COMPLETE_MARKER).touch()
+        return venv_path
 
-        if returncode != 0:
-            raise RuntimeError(f"Failed to create venv at {venv_path}: {stderr_data.decode()}")
+    async def _install_venv(
+        self, venv_path: Path, dependencies: list[str], no_cache: bool = False
+    ) -> None:
+        """Create a virtual environment and install dependencies into it using uv.
 
-        logger.info(f"Venv created. stdout: {stdout_data.decode()[:200]}")
+        Args:
+            venv_path: Where to create the venv
+            dependencies: List of pip packages
+            no_cache: Download and build every package afresh instead of using uv's cache
+        """
+        import logging
+
+        logger = logging.getLogger(__name__)
+        logger.info(f"Creating venv at {venv_path} with Python {sys.executable}")
 
-        # Install dependencies using uv (much faster and more reliable than pip)
-        # Worker needs: cloudpickle (for serialization), fastapi+uvicorn (for HTTP server)
-        all_deps = ["cloudpickle", "fastapi", "uvicorn", *dependencies]
+        proc = await asyncio.to_thread(_run_uv, "venv", "--python", sys.executable, str(venv_path))
+
+        if proc.returncode != 0:
+            raise RuntimeError(f"Failed to create venv at {venv_path}: {proc.stderr.decode()}")
+
+        logger.info(f"Venv created. stdout: {proc.stdout.decode()[:200]}")
+
+        # Install dependencies using uv (much faster and more reliable than pip). Its
+        # cache lives beside the venvs, so packages shared between dependency sets
+        # are downloaded and built only once. Hard-linking them into each venv is
+        # already uv's default on Linux; the flag pins it so an environment
+        # override cannot switch the agent to copying. Callers that disabled
+        # caching get everything fetched afresh.
+        if no_cache:
+            cache_args = ["--no-cache"]
+        else:
+            cache_args = ["--cache-dir", str(self.cache_dir / "uv"), "--link-mode", "hardlink"]
+        # Worker needs cloudpickle and msgpack (for serialization); it talks to the pool over pipes
+        all_deps = ["cloudpickle", "msgpack", *dependencies]
         venv_python_path = str(venv_path / "bin" / "python")
 
         logger.info(f"Installing {len(all_deps)} packages to {venv_python_path}: {all_deps}")
 
-        proc = await asyncio.create_subprocess_exec(
-            "uv",
+        proc = await asyncio.to_thread(
+            _run_uv,
             "pip",
             "install",
             "--python",
             venv_python_path,
-            "--no-cache",
+            # Compile to bytecode now, once, rather than on each cold worker's first import
+            "--compile-bytecode",
+            *cache_args,
             *all_deps,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
         )
-        returncode = await proc.wait()
-        stdout_data = await proc.stdout.read() if proc.stdout else b""
-        stderr_data = await proc.stderr.read() if proc.stderr else b""
-
-        if returncode != 0:
-            raise RuntimeError(f"Failed to install dependencies: {stderr_data.decode()}")
 
-        logger.info(f"Packages installed. Last 500 chars of output: {stdout_data.decode()[-500:]}")
+        if proc.returncode != 0:
+            raise RuntimeError(f"Failed to install dependencies: {proc.stderr.decode()}")
 
-        self.dep_envs[dep_hash] = venv_path
-        return venv_path
+        logger.info(f"Packages installed. Last 500 chars of output: {proc.stdout.decode()[-500:]}")
 
     async def _ensure_pool(self, dep_hash: str, venv_path: Path | None) -> WarmSandboxPool:
         """Ensure a warm pool exists for this dependency set.
@@ -172,32 +426,174 @@ class SimpleExecutor:
         Returns:
             Pool instance
         """
-        if dep_hash in self.pools:
-            return self.pools[dep_hash]
+        pool = self.pools.get(dep_hash)
+        if pool is not None:
+            self.pools.move_to_end(dep_hash)
+            self.pool_hits += 1
+            return pool
 
-        # Create new pool
-        pool = WarmSandboxPool(
-            pool_size=self.pool_size,
-            venv_path=venv_path,
-        )
+        # Concurrent first requests for a dependency set all wait on one start
+        start = self._pool_starts.get(dep_hash)
+        if start is None:
+            self.pool_misses += 1
+            start = asyncio.ensure_future(self._start_pool(dep_hash, venv_path))
+            self._pool_starts[dep_hash] = start
+
+        # Shielded so a caller that goes away does not cancel the start for the others
+        return await asyncio.shield(start)
+
+    async def _start_pool(self, dep_hash: str, venv_path: Path | None) -> WarmSandboxPool:
+        """Start a warm pool for this dependency set and add it to the cache.
+
+        Args:
+            dep_hash: Hash of dependencies
+            venv_path: Path to venv or None
+
+        Returns:
+            Pool instance
+        """
+        try:
+            await self._evict_idle_pools()
+
+            pool = WarmSandboxPool(
+                pool_size=self.pool_size,
+                venv_path=venv_path,
+            )
+
+            await pool.start()
+            self.pools[dep_hash] = pool
+            return pool
+        finally:
+            # A failed start is retried by the next request
+            del self._pool_starts[dep_hash]
+
+    async def _evict_idle_pools(self) -> None:
+        """Shut down least recently used pools until there is room for one more.
+
+        Pools with jobs still queued or running are skipped, so the pool count
+        can briefly exceed max_pools when every pool is busy.
+        """
+        while len(self.pools) >= self.max_pools:
+            dep_hash = next((h for h in self.pools if not self._active_jobs[h]), None)
+            if dep_hash is None:
+                return
+
+            pool = self.pools.pop(dep_hash)
+            self._queues.pop(dep_hash, None)
+            consumers = self._consumer_tasks.pop(dep_hash, [])
+            self.pool_evictions += 1
+
+            for task in consumers:
+                task.cancel()
+            await asyncio.gather(*consumers, return_exceptions=True)
+            await pool.shutdown()
+
+    def prune_cache(self) -> None:
+        """Remove cached environments that can never be reused.
+
+        Drops venvs built with caching disabled, venvs built by another Python
+        version and venvs left incomplete by a failed build, then has uv prune package cache entries nothing needs.
+        Meant to run once at agent start, before any venv is in use.
+        """
+        import logging
 
-        await pool.start()
-        self.pools[dep_hash] = pool
+        logger = logging.getLogger(__name__)
 
-        return pool
+        for venv_path in self.cache_dir.glob("venv-*"):
+            if (
+                venv_path.name.startswith(NO_CACHE_VENV_PREFIX)
+                or not venv_path.name.startswith(f"venv-{VENV_PYTHON_TAG}-")
+                or not (venv_path / VENV_COMPLETE_MARKER).exists()
+            ):
+                logger.info(f"Removing unusable venv {venv_path}")
+                shutil.rmtree(venv_path, ignore_errors=True)
+
+        try:
+            subprocess.run(
+                [UV_BIN, "cache", "prune", "--cache-dir", str(self.cache_dir / "uv")],
+                capture_output=True,
+                check=False,
+            )
+        except OSError as e:
+            logger.warning(f"Failed to prune uv cache: {e}")
 
     async def shutdown(self) -> None:
         """Shutdown all pools gracefully."""
-        await asyncio.gather(
-            *[pool.shutdown() for pool in self.pools.values()],
-            return_exceptions=True,
-        )
+        tasks = [task for consumers in self._consumer_tasks.values() for task in consumers]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        # Stop a few pools at a time so a large cache does not signal every worker at once
+        limit = asyncio.Semaphore(POOL_SHUTDOWN_CONCURRENCY)
+
+        async def stop(pool: WarmSandboxPool) -> None:
+            async with limit:
+                await pool.shutdown()
+
+        await asyncio.gather(*[stop(pool) for pool in self.pools.values()], return_exceptions=True)
 
 
 executor = SimpleExecutor()
 
+# Response encoder reused across requests; handlers run on the single event loop
+# thread, so it is never used concurrently
+_packer = msgpack.Packer()
+
+
+async def _read_msgpack(request: Request) -> Any:
+    """Decode a msgpack request body.
+
+    Decodes while the body arrives rather than joining its chunks into one more
+    copy of the (possibly large) pickles first.
+
+    Args:
+        request: HTTP request with msgpack payload
+
+    Returns:
+        The decoded document
+    """
+    # No size cap: the default 100 MiB limit would refuse large pickles outright
+    unpacker = msgpack.Unpacker(max_buffer_size=0)
+    async for chunk in request.stream():
+        unpacker.feed(chunk)
+    return unpacker.unpack()
+
+
+async def _execute_job(data: dict[str, Any], wait_for_slot: bool = False) -> dict[str, Any]:
+    """Run one decoded job payload on the executor, filling in defaults.
+
+    Args:
+        data: Job payload as sent by the client
+        wait_for_slot: Wait for a free queue slot instead of refusing the job
+
+    Returns:
+        Result dictionary
+    """
+    return await executor.execute(
+        fn_pickle=data["fn_pickle"],
+        args_pickle=data["args_pickle"],
+        kwargs_pickle=data["kwargs_pickle"],
+        dependencies=data.get("dependencies", []),
+        dep_hash=data.get("dep_hash", "none"),
+        timeout_sec=data.get("timeout_sec", 30),
+        memory_mb=data.get("memory_mb", 1024),
+        cpus=data.get("cpus", 1),
+        no_cache=data.get("no_cache", False),
+        wait_for_slot=wait_for_slot,
+    )
+
+
+def _error_result(e: Exception) -> dict[str, Any]:
+    """Describe a failure to run a job as a result dictionary."""
+    return {
+        "error": True,
+        # Overloaded: the client should retry later rather than the agent queueing without bound
+        "error_type": "AgentBusy" if isinstance(e, AgentBusyError) else type(e).__name__,
+        "error_message": str(e),
+    }
+
 
-@app.post("/execute")
 async def execute(request: Request) -> Response:
     """Execute a function in isolated process.
 
@@ -205,33 +601,63 @@ async def execute(request: Request) -> Response:
         request: HTTP request with msgpack payload
 
     Returns:
-        msgpack-encoded result (always returns msgpack, even for errors)
+        msgpack-encoded result (always returns msgpack, even for errors; status
+        503 with error_type "AgentBusy" when the job could not be queued)
     """
     try:
-        body = await request.body()
-        data = msgpack.unpackb(body)
-
-        result = await executor.execute(
-            fn_pickle=data["fn_pickle"],
-            args_pickle=data["args_pickle"],
-            kwargs_pickle=data["kwargs_pickle"],
-            dependencies=data.get("dependencies", []),
-            dep_hash=data.get("dep_hash", "none"),
-            timeout_sec=data.get("timeout_sec", 30),
-            memory_mb=data.get("memory_mb", 1024),
-            cpus=data.get("cpus", 1),
+        result = await _execute_job(await _read_msgpack(request))
+        return Response(content=_packer.pack(result), media_type="application/msgpack")
+    except Exception as e:
+        # Always return msgpack-encoded error response
+        return Response(
+            content=_packer.pack(_error_result(e)),
+            status_code=503 if isinstance(e, AgentBusyError) else 200,
+            media_type="application/msgpack",
         )
 
-        return Response(content=msgpack.packb(result), media_type="application/msgpack")
 
+async def execute_batch(request: Request) -> Response:
+    """Execute several functions from one request.
+
+    Jobs go through the same per-dependency-set queues as /execute, so jobs that
+    share a dependency set are dispatched to its pool together. A batch may hold
+    more jobs than a queue has slots, so its jobs wait for room rather than
+    being refused.
+
+    Args:
+        request: HTTP request with a msgpack {"jobs": [payload, ...]} document
+
+    Returns:
+        msgpack {"results": [...]} in job order, where a job that could not be
+        run carries its own error result; a msgpack error document if the
+        request itself is bad
+    """
+    try:
+        data = await _read_msgpack(request)
+        outcomes = await asyncio.gather(
+            *(_execute_job(job, wait_for_slot=True) for job in data["jobs"]),
+            return_exceptions=True,
+        )
+        results = []
+        for outcome in outcomes:
+            if isinstance(outcome, Exception):
+                results.append(_error_result(outcome))
+            elif isinstance(outcome, BaseException):
+                raise outcome
+            else:
+                results.append(outcome)
+        return Response(
+            content=_packer.pack({"results": results}), media_type="application/msgpack"
+        )
     except Exception as e:
-        # Always return msgpack-encoded error response
-        error_result = {
-            "error": True,
-            "error_type": type(e).__name__,
-            "error_message": str(e),
-        }
-        return Response(content=msgpack.packb(error_result), media_type="application/msgpack")
+        return Response(content=_packer.pack(_error_result(e)), media_type="application/msgpack")
+
+
+# The handlers read and write raw msgpack themselves, so they are mounted as
+# plain Starlette routes rather than through FastAPI's dependency resolution and
+# response handling, which they would never use
+app.add_route("/execute", execute, methods=["POST"])
+app.add_route("/execute_batch", execute_batch, methods=["POST"])
 
 
 def _compute_agent_version() -> str:
@@ -242,13 +668,19 @@ def _compute_agent_version() -> str:
     agent_dir = Path(__file__).parent
     files_to_hash = ["simple_agent.py", "pool.py", "worker.py"]
 
-    hasher = hashlib.sha256()
+    # A change fingerprint, not a security boundary: an 8-byte BLAKE2b digest is
+    # cheaper than SHA-256 and gives the same 16 hex chars without truncating
+    hasher = hashlib.blake2b(digest_size=8)
     for filename in sorted(files_to_hash):  # Sort for consistency
         file_path = agent_dir / filename
         if file_path.exists():
             hasher.update(file_path.read_bytes())
 
-    return hasher.hexdigest()[:16]  # First 16 chars of hash
+    return hasher.hexdigest()
+
+
+# Source files cannot change under a running agent, so hash them once at import
+AGENT_VERSION = _compute_agent_version()
 
 
 @app.get("/health")
@@ -263,16 +695,22 @@ async def version() -> dict[str, str]:
 
     This allows clients to detect when agent code has changed.
     """
-    return {"version": _compute_agent_version()}
+    return {"version": AGENT_VERSION}
 
 
 @app.get("/status")
 async def status() -> dict[str, Any]:
     """Status endpoint."""
     return {
-        "cached_envs": list(executor.dep_envs.keys()),
+        "cached_envs": [dep_hash for dep_hash, build in executor.dep_envs.items() if build.done()],
         "cache_dir": str(executor.cache_dir),
         "pools": {dep_hash: pool.stats() for dep_hash, pool in executor.pools.items()},
+        "pool_cache": {
+            "max_pools": executor.max_pools,
+            "hits": executor.pool_hits,
+            "misses": executor.pool_misses,
+            "evictions": executor.pool_evictions,
+        },
     }
 
 
@@ -293,8 +731,13 @@ if __name__ == "__main__":
     logger.info(f"Platform: {sys.platform}")
     logger.info(f"Working directory: {os.getcwd()}")
 
+    executor.prune_cache()
+
     try:
-        uvicorn.run(app, host="0.0.0.0", port=9000, log_level="info")
+        # Loop and HTTP parser stay on "auto", which picks uvloop and httptools
+        # (installed in the image) and falls back to asyncio and h11 without them.
+        # A log line per request would cost more than the jobs it reports.
+        uvicorn.run(app, host="0.0.0.0", port=9000, log_level="info", access_log=False)
     except Exception as e:
         logger.error(f"Failed to start uvicorn: {e}", exc_info=True)
         raise
@@ -1,107 +1,241 @@
-"""Sandbox worker - runs inside Podman container, executes code via HTTP protocol."""
+"""Sandbox worker - runs inside Podman container, executes jobs sent over stdin/stdout.
+
+The worker is a long-lived process owned by a SandboxWorker in pool.py. A
+request frame carries a batch of jobs that run back to back: a 4-byte
+big-endian job count, then for each job the 4-byte big-endian lengths of its
+pickled function, args and kwargs followed by those three pickles. The worker
+answers with one result frame per job, in order: a 1-byte tag, a 4-byte
+big-endian length, and the payload. Everything travels as raw bytes.
+"""
 
 import asyncio
-import base64
+import json
+import os
+import struct
 import sys
 import traceback
-from typing import Any
+from typing import Any, BinaryIO
 
 import cloudpickle
-import uvicorn
-from fastapi import FastAPI, Request
 
-app = FastAPI()
+try:
+    import msgpack
+except ImportError:  # venvs built before msgpack was installed into them
+    msgpack = None
+
+try:
+    import uvloop
+except ImportError:  # only present when a job's dependencies include it
+    uvloop = None
+
+# Request frame header: number of jobs as unsigned 32-bit big-endian
+HEADER = struct.Struct(">I")
+
+# Per-job header: lengths of the function, args and kwargs pickles
+JOB_HEADER = struct.Struct(">III")
+
+# Result frame header: tag byte, then payload length as unsigned 32-bit big-endian
+RESULT_HEADER = struct.Struct(">cI")
 
+# Result tags: msgpack of a plain-data return value, raw cloudpickle of any
+# other return value, or a JSON error document
+RESULT_MSGPACK = b"M"
+RESULT_PICKLE = b"P"
+RESULT_ERROR = b"E"
 
-@app.get("/health")
-async def health() -> dict[str, str]:
-    """Health check endpoint."""
-    return {"status": "ok"}
+# Nesting depth beyond which results are simply pickled
+MAX_PLAIN_DEPTH = 32
 
+# Result encoder reused across jobs; the worker runs one job at a time. A pack
+# that raises leaves it empty, ready for the next result.
+_packer = msgpack.Packer() if msgpack is not None else None
+
+
+def _is_plain(obj: Any, depth: int = 0) -> bool:
+    """Check whether msgpack round-trips obj exactly.
+
+    Only exact builtin types qualify: tuples and subclasses would come back as
+    lists and base types, so they are left to cloudpickle.
+    """
+    kind = type(obj)
+    if obj is None or kind in (bool, float, str, bytes):
+        return True
+    if kind is int:
+        return -(2**63) <= obj < 2**64
+    if depth >= MAX_PLAIN_DEPTH:
+        return False
+    if kind is list:
+        return all(_is_plain(item, depth + 1) for item in obj)
+    if kind is dict:
+        return all(type(k) is str and _is_plain(v, depth + 1) for k, v in obj.items())
+    return False
+
+
+def _pack_plain(result: Any) -> bytes | None:
+    """Encode a plain-data result as msgpack.
+
+    Args:
+        result: Return value of the sandboxed function
 
-@app.post("/execute")
-async def execute(request: Request) -> dict[str, Any]:
+    Returns:
+        msgpack bytes, or None if the result should be pickled instead
+    """
+    if _packer is None or not _is_plain(result):
+        return None
+    try:
+        return _packer.pack(result)
+    except (TypeError, ValueError, UnicodeEncodeError):
+        # e.g. strings with lone surrogates, which msgpack cannot encode as UTF-8
+        return None
+
+
+def execute(data: dict[str, Any], loop: asyncio.AbstractEventLoop) -> tuple[bytes, bytes]:
     """Execute a sandboxed function.
 
-    Request body (JSON):
-        {
-            "fn_pickle": base64-encoded pickled function,
-            "args_pickle": base64-encoded pickled args tuple,
-            "kwargs_pickle": base64-encoded pickled kwargs dict,
-        }
+    Args:
+        data: Job of the form
+            {
+                "fn_pickle": pickled function,
+                "args_pickle": pickled args tuple,
+                "kwargs_pickle": pickled kwargs dict,
+            }
+        loop: Event loop used to run coroutine results
 
     Returns:
-        {
-            "error": false,
-            "result_pickle": base64-encoded pickled result
-        }
+        (RESULT_MSGPACK, msgpack-encoded result) for plain data
+        OR
+        (RESULT_PICKLE, pickled result)
         OR
-        {
+        (RESULT_ERROR, JSON-encoded {
             "error": true,
             "error_type": "ExceptionName",
             "error_message": "error message",
             "traceback": "full traceback"
-        }
+        })
     """
     try:
-        data = await request.json()
-
-        # Decode and unpickle
-        fn = cloudpickle.loads(base64.b64decode(data["fn_pickle"]))
-        args = cloudpickle.loads(base64.b64decode(data["args_pickle"]))
-        kwargs = cloudpickle.loads(base64.b64decode(data["kwargs_pickle"]))
+        # Unpickle
+        fn = cloudpickle.loads(data["fn_pickle"])
+        args = cloudpickle.loads(data["args_pickle"])
+        kwargs = cloudpickle.loads(data["kwargs_pickle"])
 
         # Execute the function
         result = fn(*args, **kwargs)
 
         # Handle async functions
         if asyncio.iscoroutine(result):
-            result = await result
+            result = loop.run_until_complete(result)
 
-        # Return success response
-        return {
-            "error": False,
-            "result_pickle": base64.b64encode(cloudpickle.dumps(result)).decode("ascii"),
-        }
+        # Return success response, skipping cloudpickle for plain data
+        packed = _pack_plain(result)
+        if packed is not None:
+            return RESULT_MSGPACK, packed
+        return RESULT_PICKLE, cloudpickle.dumps(result)
 
     except Exception as e:
         # Return error response
-        return {
+        error = {
             "error": True,
             "error_type": type(e).__name__,
             "error_message": str(e),
             "traceback": traceback.format_exc(),
         }
+        return RESULT_ERROR, json.dumps(error).encode()
+
+
+def _warm_up(loop: asyncio.AbstractEventLoop) -> None:
+    """Run a no-op job through execute so its first real job skips one-time setup.
+
+    Touches the lazily initialized parts of cloudpickle (function
+    reconstruction) and msgpack before the worker reports ready.
+
+    Args:
+        loop: Event loop used to run coroutine results
+    """
+    noop = {
+        "fn_pickle": cloudpickle.dumps(lambda: None),
+        "args_pickle": cloudpickle.dumps(()),
+        "kwargs_pickle": cloudpickle.dumps({}),
+    }
+    execute(noop, loop)
+
+
+def _read_exact(stream: BinaryIO, size: int) -> bytes | None:
+    """Read exactly size bytes, or return None if the stream is closed first."""
+    data = stream.read(size)
+    if len(data) < size:
+        return None
+    return data
+
+
+def _read_request(stream: BinaryIO) -> list[dict[str, bytes]] | None:
+    """Read one request frame.
+
+    Args:
+        stream: Pipe from the pool
+
+    Returns:
+        The batch's jobs, or None if the stream is closed first
+    """
+    header = _read_exact(stream, HEADER.size)
+    if header is None:
+        return None
+    (count,) = HEADER.unpack(header)
+
+    jobs = []
+    for _ in range(count):
+        job_header = _read_exact(stream, JOB_HEADER.size)
+        if job_header is None:
+            return None
+        pickles = []
+        for length in JOB_HEADER.unpack(job_header):
+            data = _read_exact(stream, length)
+            if data is None:
+                return None
+            pickles.append(data)
+        fn_pickle, args_pickle, kwargs_pickle = pickles
+        jobs.append(
+            {"fn_pickle": fn_pickle, "args_pickle": args_pickle, "kwargs_pickle": kwargs_pickle}
+        )
+    return jobs
 
 
 def main() -> None:
-    """Start the worker HTTP server.
+    """Serve jobs from stdin until the pool closes the pipe.
 
-    Binds to a free port and signals readiness AFTER the socket is bound
-    to eliminate race conditions.
+    Signals readiness with a "READY" line once imports and a warm-up job are done, then
+    answers each request frame (a batch of jobs) with one result frame per job.
     """
-    import socket
-
-    # Create socket and bind to find a free port
-    # Keep socket open to prevent port reuse race condition
-    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    sock.bind(("127.0.0.1", 0))
-    port = sock.getsockname()[1]
-
-    # Signal readiness to parent process via stdout
-    # Port is now guaranteed to be ours since socket is bound
-    sys.stdout.write(f"READY:{port}\n")
-    sys.stdout.flush()
-
-    # Start server using the already-bound socket
-    # Pass file descriptor to uvicorn
-    uvicorn.run(
-        app,
-        fd=sock.fileno(),
-        log_level="error",
-        access_log=False,
-    )
+    # Keep the real stdout for protocol frames and point fd 1 at stderr, so
+    # anything the sandboxed code prints cannot corrupt the framing
+    out = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    sys.stdout = sys.stderr
+    stdin = sys.stdin.buffer
+
+    # One event loop serves every async job this worker runs, so none pays for
+    # creating and tearing down its own
+    loop = uvloop.new_event_loop() if uvloop is not None else asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    _warm_up(loop)
+
+    out.write(b"READY\n")
+    out.flush()
+
+    while True:
+        jobs = _read_request(stdin)
+        if jobs is None:
+            break
+
+        # Flush each result as soon as it is ready so the pool can time jobs individually
+        for job in jobs:
+            tag, payload = execute(job, loop)
+            out.write(RESULT_HEADER.pack(tag, len(payload)))
+            out.write(payload)
+            out.flush()
+
+    loop.close()
 
 
 if __name__ == "__main__":
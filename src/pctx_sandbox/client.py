@@ -1,5 +1,6 @@
 """Sandbox client for communicating with the sandbox agent."""
 
+import asyncio
 import time
 from typing import Any
 
@@ -8,6 +9,10 @@ import msgpack
 
 from .exceptions import SandboxStartupError
 
+# Transient agent errors worth retrying after a backoff: a worker that died or
+# stopped answering, or an agent too busy to queue the job
+RETRYABLE_ERROR_TYPES = ("ConnectionResetError", "WorkerUnresponsive", "WorkerDied", "AgentBusy")
+
 
 class SandboxClient:
     """Client for communicating with the sandbox agent."""
@@ -23,6 +28,11 @@ class SandboxClient:
         self.timeout = timeout
         self._http = httpx.Client(timeout=timeout)
 
+        # Async connections are bound to the event loop that opened them, so the
+        # async client is kept together with its loop and replaced on a new one
+        self._async_http: httpx.AsyncClient | None = None
+        self._async_http_loop: asyncio.AbstractEventLoop | None = None
+
     def __del__(self) -> None:
         """Cleanup resources."""
         try:
@@ -30,6 +40,28 @@ class SandboxClient:
         except Exception:
             pass
 
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """Get the async HTTP client for the running event loop, creating it if needed.
+
+        Returns:
+            AsyncClient whose connections are reused across calls on this loop
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_http is None or self._async_http_loop is not loop:
+            self._async_http = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_keepalive_connections=20),
+            )
+            self._async_http_loop = loop
+        return self._async_http
+
+    async def aclose(self) -> None:
+        """Close the async HTTP client and its pooled connections."""
+        if self._async_http is not None:
+            await self._async_http.aclose()
+            self._async_http = None
+            self._async_http_loop = None
+
     def wait_for_healthy(self, max_wait: int = 60) -> None:
         """Wait for the sandbox agent to be ready.
 
@@ -39,6 +71,9 @@ class SandboxClient:
         Raises:
             SandboxStartupError: If agent doesn't become healthy within max_wait
         """
+        # A freshly started agent is usually up within a second or two, so probe often
+        # at first and back off towards the old fixed interval
+        delay = 0.01
         start = time.time()
         while time.time() - start < max_wait:
             try:
@@ -48,7 +83,8 @@ class SandboxClient:
             except (httpx.ConnectError, httpx.ReadError, httpx.RemoteProtocolError):
                 # Handle connection refused, connection reset, and protocol errors during startup
                 pass
-            time.sleep(0.5)
+            time.sleep(delay)
+            delay = min(delay * 2, 0.5)
         raise SandboxStartupError(f"Agent not healthy after {max_wait}s")
 
     def execute(self, payload: dict[str, Any], max_retries: int = 3) -> dict[str, Any]:
@@ -79,7 +115,7 @@ class SandboxClient:
                 if result.get("error"):
                     error_type = result.get("error_type", "")
                     # Retry on worker-related transient errors
-                    if error_type in ("ConnectionResetError", "WorkerUnresponsive", "WorkerDied"):
+                    if error_type in RETRYABLE_ERROR_TYPES:
                         if attempt < max_retries - 1:
                             # Exponential backoff: 0.5s, 1s, 2s
                             backoff = 0.5 * (2**attempt)
@@ -121,6 +157,76 @@ class SandboxClient:
             "error_message": "Failed after maximum retries",
         }
 
+    def execute_many(
+        self, payloads: list[dict[str, Any]], max_retries: int = 3
+    ) -> list[dict[str, Any]]:
+        """Execute several sandboxed functions in one request, with retry logic.
+
+        Only the jobs that failed with a transient error are sent again.
+
+        Args:
+            payloads: One payload per call, as for execute
+            max_retries: Maximum number of retry attempts for transient errors
+
+        Returns:
+            Result dictionaries in the same order as payloads
+        """
+        results: list[dict[str, Any]] = [{} for _ in payloads]
+        pending = list(range(len(payloads)))
+
+        for attempt in range(max_retries):
+            # The jobs may all end up on one worker, so allow for them running in turn
+            timeout_sec = sum(payloads[i].get("timeout_sec", 30) for i in pending)
+            try:
+                response = self._http.post(
+                    f"{self.base_url}/execute_batch",
+                    content=msgpack.packb({"jobs": [payloads[i] for i in pending]}),
+                    headers={"Content-Type": "application/msgpack"},
+                    timeout=timeout_sec + 5,
+                )
+                body = msgpack.unpackb(response.content)
+            except (
+                httpx.TimeoutException,
+                httpx.ReadTimeout,
+                httpx.WriteTimeout,
+                httpx.PoolTimeout,
+            ):
+                for i in pending:
+                    results[i] = {
+                        "error": True,
+                        "error_type": "Timeout",
+                        "error_message": f"Execution exceeded {timeout_sec}s timeout",
+                    }
+                return results
+            except Exception as e:
+                # Network-level errors
+                if attempt < max_retries - 1:
+                    time.sleep(0.1 * (2**attempt))
+                    for i in pending:
+                        results[i] = {
+                            "error": True,
+                            "error_type": type(e).__name__,
+                            "error_message": str(e),
+                        }
+                    continue
+                raise
+
+            # A request the agent could not read at all fails every job in it
+            batch_results = body["results"] if "results" in body else [body] * len(pending)
+            retry = []
+            for i, result in zip(pending, batch_results, strict=True):
+                results[i] = result
+                if result.get("error") and result.get("error_type", "") in RETRYABLE_ERROR_TYPES:
+                    retry.append(i)
+
+            if not retry or attempt == max_retries - 1:
+                break
+            pending = retry
+            # Exponential backoff: 0.5s, 1s, 2s
+            time.sleep(0.5 * (2**attempt))
+
+        return results
+
     async def execute_async(self, payload: dict[str, Any], max_retries: int = 3) -> dict[str, Any]:
         """Execute a sandboxed function asynchronously with retry logic.
 
@@ -131,41 +237,34 @@ class SandboxClient:
         Returns:
             Result dictionary from the sandbox
         """
-        import asyncio
-
         timeout_sec = payload.get("timeout_sec", 30)
         request_timeout = timeout_sec + 5
 
         last_error = None
         for attempt in range(max_retries):
             try:
-                # Create a new AsyncClient for each request to avoid event loop issues
-                async with httpx.AsyncClient(timeout=self.timeout) as client:
-                    response = await client.post(
-                        f"{self.base_url}/execute",
-                        content=msgpack.packb(payload),
-                        headers={"Content-Type": "application/msgpack"},
-                        timeout=request_timeout,
-                    )
-                    result = msgpack.unpackb(response.content)
-
-                    # Check if we got a transient worker error
-                    if result.get("error"):
-                        error_type = result.get("error_type", "")
-                        # Retry on worker-related transient errors
-                        if error_type in (
-                            "ConnectionResetError",
-                            "WorkerUnresponsive",
-                            "WorkerDied",
-                        ):
-                            if attempt < max_retries - 1:
-                                # Exponential backoff: 0.5s, 1s, 2s
-                                backoff = 0.5 * (2**attempt)
-                                await asyncio.sleep(backoff)
-                                last_error = result
-                                continue
-
-                    return result
+                client = self._get_async_client()
+                response = await client.post(
+                    f"{self.base_url}/execute",
+                    content=msgpack.packb(payload),
+                    headers={"Content-Type": "application/msgpack"},
+                    timeout=request_timeout,
+                )
+                result = msgpack.unpackb(response.content)
+
+                # Check if we got a transient worker error
+                if result.get("error"):
+                    error_type = result.get("error_type", "")
+                    # Retry on worker-related transient errors
+                    if error_type in RETRYABLE_ERROR_TYPES:
+                        if attempt < max_retries - 1:
+                            # Exponential backoff: 0.5s, 1s, 2s
+                            backoff = 0.5 * (2**attempt)
+                            await asyncio.sleep(backoff)
+                            last_error = result
+                            continue
+
+                return result
 
             except (
                 httpx.TimeoutException,
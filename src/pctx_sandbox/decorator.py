@@ -3,10 +3,14 @@
 import functools
 import hashlib
 import inspect
+import pickle
+import types
+import weakref
 from collections.abc import Callable
 from typing import Any, TypeVar
 
 import cloudpickle
+import msgpack
 
 from .client import SandboxClient
 from .exceptions import SandboxExecutionError
@@ -15,6 +19,33 @@ from .platform import get_backend
 # Global lazy-initialized client
 _client: SandboxClient | None = None
 
+# Pickled functions, keyed by the decorated function object, with the global and
+# closure values each pickle captured
+_fn_pickles: "weakref.WeakKeyDictionary[Callable[..., Any], tuple[tuple[Any, ...], bytes]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+# Captured values that cannot change in place, so a cached pickle stays valid for
+# as long as the same objects are bound
+_IMMUTABLE_TYPES = (
+    type(None),
+    bool,
+    int,
+    float,
+    complex,
+    str,
+    bytes,
+    types.ModuleType,
+    types.BuiltinFunctionType,
+)
+
+# Stands in for a referenced global that is not (yet) defined
+_UNBOUND = object()
+
+# Pickles for the common no-args / no-kwargs call, computed once
+_EMPTY_ARGS_PICKLE = cloudpickle.dumps(())
+_EMPTY_KWARGS_PICKLE = cloudpickle.dumps({})
+
 # Type variable for decorator return type
 F = TypeVar("F", bound=Callable[..., Any])
 
@@ -34,6 +65,135 @@ def _get_client() -> SandboxClient:
     return _client
 
 
+def _dumps(obj: Any) -> bytes:
+    """Pickle a call argument, with the stdlib pickler when that is enough.
+
+    cloudpickle writes the stdlib format, so the worker loads either kind, but its
+    pickler is several times slower on small objects. It is only needed for what the
+    stdlib pickler refuses (lambdas, local functions and classes) or would pickle by
+    a reference the worker cannot resolve: anything defined in __main__ or in a
+    module registered with cloudpickle.register_pickle_by_value.
+
+    Args:
+        obj: Object to pickle
+
+    Returns:
+        Pickle bytes
+    """
+    if not cloudpickle.list_registry_pickle_by_value():
+        try:
+            data = pickle.dumps(obj, protocol=cloudpickle.DEFAULT_PROTOCOL)
+        except Exception:
+            pass
+        else:
+            # A false positive (the string in the data itself) only costs the slow path
+            if b"__main__" not in data:
+                return data
+    return cloudpickle.dumps(obj)
+
+
+def _pickle_call_args(args: tuple[Any, ...], kwargs: dict[str, Any]) -> tuple[bytes, bytes]:
+    """Serialize call arguments, reusing the precomputed pickles for empty ones.
+
+    Args:
+        args: Positional arguments
+        kwargs: Keyword arguments
+
+    Returns:
+        (args_pickle, kwargs_pickle)
+    """
+    args_pickle = _dumps(args) if args else _EMPTY_ARGS_PICKLE
+    kwargs_pickle = _dumps(kwargs) if kwargs else _EMPTY_KWARGS_PICKLE
+    return args_pickle, kwargs_pickle
+
+
+def _load_result(response: dict[str, Any]) -> Any:
+    """Deserialize the return value from a successful agent response.
+
+    Plain-data results come back as msgpack; everything else is cloudpickled.
+
+    Args:
+        response: Result dictionary from the agent
+
+    Returns:
+        The sandboxed function's return value
+    """
+    if "result_msgpack" in response:
+        return msgpack.unpackb(response["result_msgpack"])
+    return cloudpickle.loads(response["result_pickle"])
+
+
+@functools.lru_cache(maxsize=256)
+def _referenced_names(code: types.CodeType) -> tuple[str, ...]:
+    """List the global names a code object and its nested functions may load.
+
+    Args:
+        code: Code object of a function
+
+    Returns:
+        Sorted candidate global names
+    """
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names.update(_referenced_names(const))
+    return tuple(sorted(names))
+
+
+def _captured_values(fn: Callable[..., Any]) -> tuple[Any, ...] | None:
+    """Collect the global and closure values cloudpickle copies along with fn.
+
+    Args:
+        fn: The undecorated function
+
+    Returns:
+        The values, or None if any of them could change without being rebound
+        (a list, a class, another function, ...), in which case fn's pickle
+        cannot be reused
+    """
+    fn_globals = getattr(fn, "__globals__", {})
+    values = [fn_globals.get(name, _UNBOUND) for name in _referenced_names(fn.__code__)]
+    for cell in getattr(fn, "__closure__", None) or ():
+        try:
+            values.append(cell.cell_contents)
+        except ValueError:  # cell not filled in yet
+            values.append(_UNBOUND)
+
+    if all(value is _UNBOUND or isinstance(value, _IMMUTABLE_TYPES) for value in values):
+        return tuple(values)
+    return None
+
+
+def _pickle_function(fn: Callable[..., Any]) -> bytes:
+    """Serialize a sandboxed function, reusing the bytes from earlier calls.
+
+    The function is pickled on its first call rather than at decoration time so
+    that module globals defined after the decorator are still captured. cloudpickle
+    copies the globals and closure variables the function uses into the pickle,
+    so the bytes are only reused while those are immutable and still bound to the
+    same objects; rebinding one (``LIMIT = 2``) re-pickles the function.
+
+    Args:
+        fn: The undecorated function
+
+    Returns:
+        cloudpickle bytes for fn
+    """
+    captured = _captured_values(fn)
+    cached = _fn_pickles.get(fn)
+    if cached is not None and captured is not None:
+        values, fn_pickle = cached
+        if len(values) == len(captured) and all(
+            old is new for old, new in zip(values, captured, strict=True)
+        ):
+            return fn_pickle
+
+    fn_pickle = cloudpickle.dumps(fn)
+    if captured is not None:
+        _fn_pickles[fn] = (captured, fn_pickle)
+    return fn_pickle
+
+
 def sandbox(
     dependencies: list[str] | None = None,
     memory_mb: int = 1024,
@@ -50,7 +210,8 @@ def sandbox(
         timeout_sec: Maximum execution time
         cpus: Number of CPUs
         allow_network: List of allowed hostnames (None = no network)
-        disable_cache: If True, bypass dependency cache (forces fresh install)
+        disable_cache: If True, build a fresh environment for this function without
+            reusing cached venvs or downloaded packages
 
     Returns:
         Decorated function that executes in sandbox
@@ -86,12 +247,14 @@ def sandbox(
                 client = _get_client()
 
                 # Serialize the function and arguments
+                args_pickle, kwargs_pickle = _pickle_call_args(args, kwargs)
                 payload = {
-                    "fn_pickle": cloudpickle.dumps(fn),
-                    "args_pickle": cloudpickle.dumps(args),
-                    "kwargs_pickle": cloudpickle.dumps(kwargs),
+                    "fn_pickle": _pickle_function(fn),
+                    "args_pickle": args_pickle,
+                    "kwargs_pickle": kwargs_pickle,
                     "dependencies": dependencies,
                     "dep_hash": dep_hash,
+                    "no_cache": disable_cache,
                     "memory_mb": memory_mb,
                     "timeout_sec": timeout_sec,
                     "cpus": cpus,
@@ -114,7 +277,7 @@ def sandbox(
                     )
 
                 # Deserialize and return result
-                return cloudpickle.loads(response["result_pickle"])
+                return _load_result(response)
 
             # Mark as sandboxed for introspection
             async_wrapper._is_sandboxed = True  # type: ignore
@@ -123,6 +286,7 @@ def sandbox(
                 "memory_mb": memory_mb,
                 "timeout_sec": timeout_sec,
                 "dep_hash": dep_hash,
+                "no_cache": disable_cache,
             }
 
             return async_wrapper  # type: ignore
@@ -134,12 +298,14 @@ def sandbox(
                 client = _get_client()
 
                 # Serialize the function and arguments
+                args_pickle, kwargs_pickle = _pickle_call_args(args, kwargs)
                 payload = {
-                    "fn_pickle": cloudpickle.dumps(fn),
-                    "args_pickle": cloudpickle.dumps(args),
-                    "kwargs_pickle": cloudpickle.dumps(kwargs),
+                    "fn_pickle": _pickle_function(fn),
+                    "args_pickle": args_pickle,
+                    "kwargs_pickle": kwargs_pickle,
                     "dependencies": dependencies,
                     "dep_hash": dep_hash,
+                    "no_cache": disable_cache,
                     "memory_mb": memory_mb,
                     "timeout_sec": timeout_sec,
                     "cpus": cpus,
@@ -162,7 +328,7 @@ def sandbox(
                     )
 
                 # Deserialize and return result
-                return cloudpickle.loads(response["result_pickle"])
+                return _load_result(response)
 
             # Mark as sandboxed for introspection
             sync_wrapper._is_sandboxed = True  # type: ignore
@@ -171,6 +337,7 @@ def sandbox(
                 "memory_mb": memory_mb,
                 "timeout_sec": timeout_sec,
                 "dep_hash": dep_hash,
+                "no_cache": disable_cache,
             }
 
             return sync_wrapper  # type: ignore
@@ -194,7 +361,8 @@ def sandbox_async(
         timeout_sec: Maximum execution time
         cpus: Number of vCPUs
         allow_network: List of allowed hostnames
-        disable_cache: If True, bypass dependency cache (forces fresh install)
+        disable_cache: If True, build a fresh environment for this function without
+            reusing cached venvs or downloaded packages
 
     Returns:
         Decorated async function that executes in sandbox
@@ -219,12 +387,14 @@ def sandbox_async(
         async def wrapper(*args: Any, **kwargs: Any) -> Any:
             client = _get_client()
 
+            args_pickle, kwargs_pickle = _pickle_call_args(args, kwargs)
             payload = {
-                "fn_pickle": cloudpickle.dumps(fn),
-                "args_pickle": cloudpickle.dumps(args),
-                "kwargs_pickle": cloudpickle.dumps(kwargs),
+                "fn_pickle": _pickle_function(fn),
+                "args_pickle": args_pickle,
+                "kwargs_pickle": kwargs_pickle,
                 "dependencies": dependencies,
                 "dep_hash": dep_hash,
+                "no_cache": disable_cache,
                 "memory_mb": memory_mb,
                 "timeout_sec": timeout_sec,
                 "cpus": cpus,
@@ -237,7 +407,7 @@ def sandbox_async(
             if response.get("error"):
                 raise SandboxExecutionError(response["error_message"])
 
-            return cloudpickle.loads(response["result_pickle"])
+            return _load_result(response)
 
         wrapper._is_sandboxed = True  # type: ignore
         wrapper._sandbox_config = {  # type: ignore
@@ -245,6 +415,7 @@ def sandbox_async(
             "memory_mb": memory_mb,
             "timeout_sec": timeout_sec,
             "dep_hash": dep_hash,
+            "no_cache": disable_cache,
         }
 
         return wrapper  # type: ignore
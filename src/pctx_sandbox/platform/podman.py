@@ -1,8 +1,13 @@
 """Podman backend for container-based sandboxing."""
 
+import collections
 import os
 import shutil
 import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import httpx
@@ -12,13 +17,25 @@ from pctx_sandbox.exceptions import SandboxStartupError
 
 from .base import SandboxBackend
 
+# Registry auth config with no credentials
+EMPTY_AUTH = '{"auths":{}}'
+
+# Lines from the end of a failed podman build included in the error
+BUILD_LOG_TAIL_LINES = 200
+
 
 class PodmanBackend(SandboxBackend):
     """Podman-based backend using rootless containers."""
 
     CONTAINER_NAME = "pctx-sandbox-agent"
     IMAGE_NAME = "pctx-sandbox-agent"
+    # Named volume holding dependency venvs so they survive container restarts
+    CACHE_VOLUME = "pctx-sandbox-cache"
     AGENT_PORT = 9000
+    # uid and gid of the image's sandbox user (see Dockerfile.agent)
+    SANDBOX_UID = 1000
+    # How long a positive is_running answer is trusted before asking podman again
+    RUNNING_CACHE_TTL_SEC = 1.0
 
     def __init__(
         self,
@@ -34,6 +51,22 @@ class PodmanBackend(SandboxBackend):
         self._agent_url = f"http://localhost:{self.AGENT_PORT}"
         self.cpus = cpus or int(os.getenv("PCTX_PODMAN_CPUS", "4"))
         self.memory_gb = memory_gb or int(os.getenv("PCTX_PODMAN_MEMORY_GB", "4"))
+        # Each podman call costs a fork/exec plus podman's own startup, so answers
+        # that cannot change without this backend's help are remembered
+        self._image_ready = False
+        self._running_until = 0.0
+        self._cgroup_controllers: bool | None = None
+        # Health probes reuse one kept-alive connection rather than a handshake each;
+        # opened on the first probe, since building a client costs far more than a backend
+        self._probe_http: httpx.Client | None = None
+
+    def __del__(self) -> None:
+        """Close the health probe client's pooled connection."""
+        try:
+            if self._probe_http is not None:
+                self._probe_http.close()
+        except Exception:
+            pass
 
     @property
     def agent_url(self) -> str:
@@ -46,6 +79,9 @@ class PodmanBackend(SandboxBackend):
 
     def is_running(self) -> bool:
         """Check if the sandbox container is running."""
+        if time.monotonic() < self._running_until:
+            return True
+
         result = subprocess.run(
             ["podman", "ps", "--filter", f"name={self.CONTAINER_NAME}", "--format", "{{.ID}}"],
             capture_output=True,
@@ -60,12 +96,21 @@ class PodmanBackend(SandboxBackend):
             return False
 
         # Verify agent is healthy
+        if self._probe_http is None:
+            self._probe_http = httpx.Client(
+                timeout=1.0, limits=httpx.Limits(max_keepalive_connections=1)
+            )
         try:
-            response = httpx.get(f"{self.agent_url}/health", timeout=1.0)
-            return response.status_code == 200
-        except httpx.ConnectError:
+            response = self._probe_http.get(f"{self.agent_url}/health")
+        except (httpx.ConnectError, httpx.ReadError, httpx.RemoteProtocolError):
+            # A kept-alive connection to a since restarted agent fails on reuse
+            return False
+        if response.status_code != 200:
             return False
 
+        self._running_until = time.monotonic() + self.RUNNING_CACHE_TTL_SEC
+        return True
+
     def ensure_running(self) -> None:
         """Ensure the sandbox container is running."""
         if self.is_running():
@@ -83,14 +128,18 @@ class PodmanBackend(SandboxBackend):
 
     def _ensure_image(self) -> None:
         """Ensure the agent container image exists."""
-        # Check if image exists
+        if self._image_ready:
+            return
+
+        # Check if image exists; answered by exit code alone, without listing the store
         result = subprocess.run(
-            ["podman", "images", "--filter", f"reference={self.IMAGE_NAME}", "--format", "{{.ID}}"],
-            capture_output=True,
-            text=True,
+            ["podman", "image", "exists", self.IMAGE_NAME],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
         )
 
-        if result.returncode == 0 and result.stdout.strip():
+        if result.returncode == 0:
+            self._image_ready = True
             return
 
         # Build image
@@ -101,44 +150,63 @@ class PodmanBackend(SandboxBackend):
             raise SandboxStartupError(f"Dockerfile not found at {dockerfile_path}")
 
         # Get Python version to match host
-        import sys
-        import tempfile
-
         python_version = f"{sys.version_info.major}.{sys.version_info.minor}"
 
-        # Create temporary empty auth file to disable credential helpers
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".json", delete=False) as f:
-            f.write('{"auths":{}}')
-            authfile_path = f.name
-
-        try:
-            subprocess.run(
-                [
-                    "podman",
-                    "build",
-                    f"--authfile={authfile_path}",  # Use empty auth file
-                    "--build-arg",
-                    f"PYTHON_VERSION={python_version}",
-                    "-t",
-                    self.IMAGE_NAME,
-                    "-f",
-                    str(dockerfile_path),
-                    str(agent_dir.parent),
-                ],
-                check=True,
-                capture_output=True,
-                text=True,
-            )
-        except subprocess.CalledProcessError as e:
+        cmd = [
+            "podman",
+            "build",
+            f"--authfile={self._authfile()}",  # Use empty auth file
+            "--build-arg",
+            f"PYTHON_VERSION={python_version}",
+            "-t",
+            self.IMAGE_NAME,
+            "-f",
+            str(dockerfile_path),
+            str(agent_dir.parent),
+        ]
+        # Stream the build log and keep only its end, where podman reports a failure,
+        # rather than buffering the whole log of a successful build
+        with subprocess.Popen(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+        ) as process:
+            tail = collections.deque(process.stdout or (), maxlen=BUILD_LOG_TAIL_LINES)
+
+        if process.returncode != 0:
             raise SandboxStartupError(
-                f"Failed to build Podman image: {e}\nStdout: {e.stdout}\nStderr: {e.stderr}"
-            ) from e
-        finally:
-            # Clean up temp file
-            Path(authfile_path).unlink(missing_ok=True)
+                f"Failed to build Podman image (exit code {process.returncode})\n"
+                f"Output: {''.join(tail)}"
+            )
+
+        self._image_ready = True
+
+    def _authfile(self) -> Path:
+        """Get the empty registry auth file, writing it on first use.
+
+        Passing an empty auth file keeps podman from calling credential helpers.
+        Its content never changes, so one file in the user's cache directory
+        serves every build and run instead of a temp file per command.
+
+        Returns:
+            Path to the auth file
+        """
+        cache_home = os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache"
+        path = Path(cache_home) / "pctx-sandbox" / "empty-auth.json"
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write a uniquely named file beside it and rename, so a concurrent reader
+            # never sees a partial file and concurrent writers never share a temp file
+            fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+            with os.fdopen(fd, "w") as f:
+                f.write(EMPTY_AUTH)
+            os.replace(tmp_name, path)
+        return path
 
     def _has_cgroup_controllers(self) -> bool:
         """Check if cpu cgroup controller is available for podman."""
+        # Fixed for the life of the host's cgroup setup, and probing it starts a container
+        if self._cgroup_controllers is not None:
+            return self._cgroup_controllers
+
         # Try to run a simple container with cpu limits to see if it works
         result = subprocess.run(
             [
@@ -150,31 +218,29 @@ class PodmanBackend(SandboxBackend):
                 "alpine:latest",
                 "true",
             ],
-            capture_output=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
         )
-        return result.returncode == 0
+        self._cgroup_controllers = result.returncode == 0
+        return self._cgroup_controllers
 
     def _start_container(self) -> None:
         """Start the agent container."""
+        self._running_until = 0.0
+
         # Remove old container if it exists
         subprocess.run(
             ["podman", "rm", "-f", self.CONTAINER_NAME],
-            capture_output=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
         )
 
-        # Create temporary empty auth file to disable credential helpers
-        import tempfile
-
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".json", delete=False) as f:
-            f.write('{"auths":{}}')
-            authfile_path = f.name
-
         # Build base command
         cmd = [
             "podman",
             "run",
             "-d",
-            f"--authfile={authfile_path}",  # Use empty auth file
+            f"--authfile={self._authfile()}",  # Use empty auth file
             "--name",
             self.CONTAINER_NAME,
         ]
@@ -195,8 +261,15 @@ class PodmanBackend(SandboxBackend):
             [
                 "-p",
                 f"{self.AGENT_PORT}:{self.AGENT_PORT}",
-                # Enforce proper isolation
-                "--userns=auto",  # Use user namespace remapping
+                # Persist dependency venvs across container restarts. A new volume
+                # takes its ownership from the image's cache directory once.
+                "-v",
+                f"{self.CACHE_VOLUME}:/tmp/pctx-cache",
+                # Enforce proper isolation: user namespace remapping, with the
+                # sandbox user pinned to the same subordinate id on every start so
+                # the volume stays its own without a recursive chown (:U) per start
+                f"--userns=auto:uidmapping={self.SANDBOX_UID}:{self.SANDBOX_UID}:1,"
+                f"gidmapping={self.SANDBOX_UID}:{self.SANDBOX_UID}:1",
                 "--pid=private",  # Private PID namespace
                 "--ipc=private",  # Private IPC namespace
                 # Drop all capabilities
@@ -223,27 +296,35 @@ class PodmanBackend(SandboxBackend):
             raise SandboxStartupError(
                 f"Failed to start Podman container: {e}\nStdout: {e.stdout}\nStderr: {e.stderr}"
             ) from e
-        finally:
-            # Clean up temp file
-            Path(authfile_path).unlink(missing_ok=True)
 
     def stop(self) -> None:
         """Stop the sandbox container."""
+        self._running_until = 0.0
         subprocess.run(
             ["podman", "stop", self.CONTAINER_NAME],
-            capture_output=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
         )
 
     def destroy(self) -> None:
         """Destroy the sandbox container and image."""
+        self._running_until = 0.0
+        self._image_ready = False
         # Stop and remove container
         subprocess.run(
             ["podman", "rm", "-f", self.CONTAINER_NAME],
-            capture_output=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
         )
 
-        # Remove image
-        subprocess.run(
+        # With the container gone, the image and the persisted dependency cache are
+        # independent of each other, so remove both at once
+        removals = [
             ["podman", "rmi", "-f", self.IMAGE_NAME],
-            capture_output=True,
-        )
+            ["podman", "volume", "rm", "-f", self.CACHE_VOLUME],
+        ]
+        with ThreadPoolExecutor(max_workers=len(removals)) as pool:
+            for cmd in removals:
+                pool.submit(
+                    subprocess.run, cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+                )
@@ -7,6 +7,9 @@ import pytest
 
 from pctx_sandbox.platform import get_backend
 
+# How long a healthy pre-test probe is trusted by the tests that follow it
+HEALTH_FRESH_SEC = 10.0
+
 
 def pytest_collection_modifyitems(config, items):
     """Automatically skip tests that require sandbox agent when it's not available.
@@ -31,6 +34,43 @@ def pytest_collection_modifyitems(config, items):
                 item.add_marker(skip_agent)
 
 
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    """Forget the last healthy probe when a test fails, so the next test probes again."""
+    outcome = yield
+    if outcome.get_result().failed:
+        item.session._sandbox_healthy_at = None
+
+
+@pytest.fixture(scope="session", autouse=True)
+def warm_backend(request):
+    """Start the sandbox backend once before any test when collected tests will use it.
+
+    Building the image and starting the container otherwise lands on whichever
+    sandbox test runs first, which looks like a hang in the test output.
+    """
+    if not any(
+        "requires_sandbox_agent" in item.keywords and not item.get_closest_marker("skip")
+        for item in request.session.items
+    ):
+        return
+
+    try:
+        backend = get_backend()
+        if backend.is_available():
+            backend.ensure_running()
+    except Exception:
+        # Leave the failure to surface in the tests that need the backend
+        pass
+
+
+@pytest.fixture(scope="session")
+def health_client():
+    """HTTP client shared by every pre-test health probe, so probes reuse one connection."""
+    with httpx.Client(timeout=1, limits=httpx.Limits(max_keepalive_connections=4)) as client:
+        yield client
+
+
 @pytest.fixture(autouse=True)
 def ensure_pool_health(request):
     """Ensure worker pool is healthy before tests that use the sandbox.
@@ -42,30 +82,33 @@ def ensure_pool_health(request):
         yield
         return
 
-    # Before test: wait for at least one healthy worker
+    # Before test: wait for at least one healthy worker, unless a recent test already did
+    healthy_at = getattr(request.session, "_sandbox_healthy_at", None)
     try:
         backend = get_backend()
-        if backend.is_available():
+        if backend.is_available() and (
+            healthy_at is None or time.monotonic() - healthy_at >= HEALTH_FRESH_SEC
+        ):
+            client = request.getfixturevalue("health_client")
             max_wait = 5  # seconds
+            delay = 0.025  # doubled after each miss, up to 0.2s
             start = time.time()
             while time.time() - start < max_wait:
                 try:
                     # Simple health check - if this succeeds, pool has workers
-                    with httpx.Client(timeout=1) as client:
-                        response = client.get(f"{backend.agent_url}/health")
-                        if response.status_code == 200:
-                            break
+                    response = client.get(f"{backend.agent_url}/health")
+                    if response.status_code == 200:
+                        request.session._sandbox_healthy_at = time.monotonic()
+                        break
                 except Exception:
                     pass
-                time.sleep(0.2)
+                time.sleep(delay)
+                delay = min(delay * 2, 0.2)
     except Exception:
         pass
 
     yield
 
-    # After test, brief pause to let any async cleanup happen
-    time.sleep(0.05)
-
 
 @pytest.fixture
 def sample_function():
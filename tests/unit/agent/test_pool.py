@@ -0,0 +1,240 @@
+"""Tests for the warm worker pool and its pipe protocol."""
+
+import asyncio
+import os
+import sys
+import time
+
+import cloudpickle
+import msgpack
+import pytest
+
+from pctx_sandbox.agent.pool import (
+    STDERR_CHUNK_SIZE,
+    STDERR_TAIL_CHUNKS,
+    SandboxWorker,
+    WarmSandboxPool,
+)
+
+
+def _job(fn, *args, **kwargs) -> tuple[bytes, bytes, bytes]:
+    return cloudpickle.dumps(fn), cloudpickle.dumps(args), cloudpickle.dumps(kwargs)
+
+
+def _batch_job(fn, *args, timeout_sec: int = 5) -> dict:
+    return {
+        "fn_pickle": cloudpickle.dumps(fn),
+        "args_pickle": cloudpickle.dumps(args),
+        "kwargs_pickle": cloudpickle.dumps({}),
+        "timeout_sec": timeout_sec,
+    }
+
+
+def _value(result: dict):
+    if "result_msgpack" in result:
+        return msgpack.unpackb(result["result_msgpack"])
+    return cloudpickle.loads(result["result_pickle"])
+
+
+@pytest.fixture
+async def worker():
+    """A real worker process running on the host interpreter."""
+    w = SandboxWorker(worker_id=0, python_bin=sys.executable)
+    await w.start()
+    yield w
+    await w.shutdown()
+
+
+class TestSandboxWorker:
+    """Tests for SandboxWorker talking to worker.py over stdin/stdout."""
+
+    async def test_executes_jobs_on_one_process(self, worker):
+        """Should run several jobs back to back on the same process."""
+        pid = worker.process.pid
+
+        for x in range(3):
+            result = await worker.execute(*_job(lambda v: v * 2, x), timeout_sec=5)
+            assert result["error"] is False
+            assert _value(result) == x * 2
+
+        assert worker.process.pid == pid
+        assert worker.jobs_executed == 3
+        assert worker.is_healthy
+
+    async def test_large_binary_result(self, worker):
+        """Should return results larger than the pipe buffer byte for byte."""
+        blob = bytes(range(256)) * 4096
+
+        result = await worker.execute(*_job(lambda: blob), timeout_sec=5)
+
+        assert _value(result) == blob
+        assert worker.is_healthy
+
+    async def test_large_binary_argument(self, worker):
+        """Should deliver arguments larger than the pipe buffer intact."""
+        blob = bytes(range(256)) * 4096
+
+        result = await worker.execute(*_job(lambda b: b == blob, blob), timeout_sec=5)
+
+        assert _value(result) is True
+
+    async def test_plain_results_use_msgpack(self, worker):
+        """Should send plain data as msgpack and anything msgpack would alter as a pickle."""
+        plain = {"n": 1, "xs": [1.5, None, True], "raw": b"\x00", "s": "text"}
+
+        result = await worker.execute(*_job(lambda: plain), timeout_sec=5)
+        assert "result_pickle" not in result
+        assert msgpack.unpackb(result["result_msgpack"]) == plain
+
+        for value in [(1, 2), {1: "int key"}, 2**64, [frozenset()], "\ud800", ["ok", "\ud800"]]:
+            result = await worker.execute(*_job(lambda v=value: v), timeout_sec=5)
+            assert "result_msgpack" not in result
+            assert cloudpickle.loads(result["result_pickle"]) == value
+
+        # A value that failed to encode leaves nothing behind in the next result
+        result = await worker.execute(*_job(lambda: plain), timeout_sec=5)
+        assert msgpack.unpackb(result["result_msgpack"]) == plain
+
+    async def test_reports_exceptions(self, worker):
+        """Should return error details and keep the worker usable."""
+
+        def fail() -> None:
+            raise ValueError("bad input")
+
+        result = await worker.execute(*_job(fail), timeout_sec=5)
+
+        assert result["error"] is True
+        assert result["error_type"] == "ValueError"
+        assert result["error_message"] == "bad input"
+        assert "Traceback" in result["traceback"]
+        assert worker.is_healthy
+
+    async def test_prints_do_not_corrupt_protocol(self, worker):
+        """Should keep output written by the job out of the result channel."""
+
+        def noisy() -> str:
+            print("hello from the sandbox")
+            sys.stdout.write("more output\n")
+            return "done"
+
+        result = await worker.execute(*_job(noisy), timeout_sec=5)
+
+        assert _value(result) == "done"
+
+    async def test_output_beyond_pipe_buffer_does_not_block(self, worker):
+        """Should keep draining job output so large prints cannot stall the worker."""
+
+        def chatty() -> int:
+            for i in range(20000):
+                print(f"line {i:05d} " + "x" * 40)
+            return 1
+
+        result = await worker.execute(*_job(chatty), timeout_sec=5)
+
+        assert _value(result) == 1
+        await asyncio.sleep(0.05)
+        tail = worker.stderr_tail()
+        assert "line 19999" in tail
+        assert len(tail) <= STDERR_TAIL_CHUNKS * STDERR_CHUNK_SIZE
+
+    async def test_awaits_coroutine_results(self, worker):
+        """Should run async functions to completion."""
+
+        async def add(a: int, b: int) -> int:
+            return a + b
+
+        result = await worker.execute(*_job(add, 1, b=2), timeout_sec=5)
+
+        assert _value(result) == 3
+
+    async def test_timeout_applies_per_job(self, worker):
+        """Should keep results finished before a hung job and fail only from that job on."""
+        jobs = [
+            _batch_job(lambda: "quick", timeout_sec=1),
+            _batch_job(lambda: "also quick", timeout_sec=1),
+            _batch_job(time.sleep, 30, timeout_sec=1),
+            _batch_job(lambda: "queued", timeout_sec=1),
+        ]
+
+        started = time.monotonic()
+        results = await worker.execute_batch(jobs)
+
+        assert time.monotonic() - started < 5
+        assert [_value(r) for r in results[:2]] == ["quick", "also quick"]
+        assert results[2]["error_type"] == "Timeout"
+        assert results[3]["error_type"] == "WorkerUnresponsive"
+        assert not worker.is_healthy
+
+    async def test_async_jobs_share_one_event_loop(self, worker):
+        """Should run every async job on the worker's single event loop."""
+
+        async def loop_id() -> int:
+            return id(asyncio.get_running_loop())
+
+        first = await worker.execute(*_job(loop_id), timeout_sec=5)
+        second = await worker.execute(*_job(loop_id), timeout_sec=5)
+        current = await worker.execute(*_job(lambda: id(asyncio.get_event_loop())), timeout_sec=5)
+
+        assert _value(first) == _value(second) == _value(current)
+
+    async def test_worker_exit_marks_unhealthy(self, worker):
+        """Should report WorkerDied when the process goes away mid-job."""
+        result = await worker.execute(*_job(os._exit, 1), timeout_sec=5)
+
+        assert result["error"] is True
+        assert result["error_type"] == "WorkerDied"
+        assert not worker.is_healthy
+
+
+class TestWarmSandboxPool:
+    """Tests for WarmSandboxPool batch dispatch."""
+
+    async def test_execute_batch_splits_across_idle_workers(self):
+        """Should spread a batch over idle workers and keep results in job order."""
+        pool = WarmSandboxPool(pool_size=2)
+        await pool.start()
+        try:
+            jobs = [_batch_job(lambda v: v * 2, x) for x in range(5)]
+
+            results = await pool.execute_batch(jobs)
+
+            assert [_value(r) for r in results] == [
+                0,
+                2,
+                4,
+                6,
+                8,
+            ]
+            assert sorted(w.jobs_executed for w in pool.workers) == [2, 3]
+            assert not any(w.is_busy for w in pool.workers)
+        finally:
+            await pool.shutdown()
+
+    async def test_ad_hoc_worker_is_not_shared_during_handoff(self):
+        """Should keep a new ad-hoc worker claimed until its batch has run on it."""
+        pool = WarmSandboxPool(pool_size=1)
+        await pool.start()
+        pool.workers[0].is_busy = True
+        original_create = pool._create_worker
+        other_batch: list[asyncio.Task] = []
+
+        async def create_and_race(**kwargs):
+            worker = await original_create(**kwargs)
+            if not other_batch:
+                # Fire another batch while the ad-hoc worker is being handed off
+                other_batch.append(
+                    asyncio.create_task(pool.execute_batch([_batch_job(lambda: "other")]))
+                )
+                await asyncio.sleep(0)
+            return worker
+
+        pool._create_worker = create_and_race
+        try:
+            results = await pool.execute_batch([_batch_job(lambda: "first")])
+            other_results = await other_batch[0]
+
+            assert [_value(r) for r in results] == ["first"]
+            assert [_value(r) for r in other_results] == ["other"]
+            assert len(pool.workers) == 3
+        finally:
+            await pool.shutdown()
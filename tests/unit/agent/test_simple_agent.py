@@ -0,0 +1,423 @@
+"""Tests for the sandbox agent's executor."""
+
+import asyncio
+import hashlib
+from unittest.mock import patch
+
+import cloudpickle
+import httpx
+import msgpack
+import pytest
+
+from pctx_sandbox.agent import simple_agent
+from pctx_sandbox.agent.pool import WarmSandboxPool
+from pctx_sandbox.agent.simple_agent import (
+    NO_CACHE_VENV_PREFIX,
+    VENV_COMPLETE_MARKER,
+    VENV_PYTHON_TAG,
+    AgentBusyError,
+    SimpleExecutor,
+)
+
+# Stand-in for uv: "venv" lays out a venv directory, "pip install" fails until
+# the file named by $FAKE_UV_OK exists
+FAKE_UV = """#!/bin/sh
+if [ "$1" = venv ]; then
+    mkdir -p "$4/bin" && touch "$4/bin/python"
+    exit 0
+fi
+echo "$@" >> "$FAKE_UV_LOG"
+if [ ! -e "$FAKE_UV_OK" ]; then
+    echo "no matching distribution" >&2
+    exit 1
+fi
+"""
+
+
+@pytest.fixture
+def fake_uv(tmp_path, monkeypatch):
+    """Make the agent run FAKE_UV as uv, logging its calls to tmp_path/uv.log."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    uv = bin_dir / "uv"
+    uv.write_text(FAKE_UV)
+    uv.chmod(0o755)
+    monkeypatch.setattr(simple_agent, "UV_BIN", str(uv))
+    monkeypatch.setenv("FAKE_UV_LOG", str(tmp_path / "uv.log"))
+    monkeypatch.setenv("FAKE_UV_OK", str(tmp_path / "ok"))
+
+
+class TestSimpleExecutor:
+    """Tests for SimpleExecutor job dispatch."""
+
+    async def test_concurrent_jobs_are_batched(self, tmp_path):
+        """Should coalesce a burst of jobs into fewer pool dispatches."""
+        executor = SimpleExecutor(cache_dir=tmp_path, pool_size=2)
+        fn_pickle = cloudpickle.dumps(lambda v: v + 1)
+
+        async def run(x: int) -> dict:
+            return await executor.execute(
+                fn_pickle=fn_pickle,
+                args_pickle=cloudpickle.dumps((x,)),
+                kwargs_pickle=cloudpickle.dumps({}),
+                dependencies=[],
+                dep_hash="none",
+            )
+
+        try:
+            # Bring up the pool first so the burst below only measures dispatch
+            await run(0)
+
+            with patch.object(
+                WarmSandboxPool,
+                "execute_batch",
+                autospec=True,
+                side_effect=WarmSandboxPool.execute_batch,
+            ) as mock_batch:
+                results = await asyncio.gather(*(run(x) for x in range(20)))
+
+            assert [msgpack.unpackb(r["result_msgpack"]) for r in results] == list(range(1, 21))
+            assert mock_batch.call_count < 20
+        finally:
+            await executor.shutdown()
+
+    async def test_consumers_bound_batches_in_flight(self, tmp_path):
+        """Should run at most one batch per consumer and refuse jobs beyond the queue."""
+        executor = SimpleExecutor(cache_dir=tmp_path, pool_size=1, max_batch=2, consumers=2)
+        release = asyncio.Event()
+        in_flight = peak = 0
+
+        async def slow_batch(pool, jobs, memory_mb=1024, cpus=1):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await release.wait()
+            in_flight -= 1
+            return [{"error": False, "result_msgpack": msgpack.packb(None)} for _ in jobs]
+
+        async def run() -> dict:
+            return await executor.execute(
+                fn_pickle=cloudpickle.dumps(lambda: None),
+                args_pickle=cloudpickle.dumps(()),
+                kwargs_pickle=cloudpickle.dumps({}),
+                dependencies=[],
+                dep_hash="none",
+            )
+
+        try:
+            await run()
+
+            with patch.object(WarmSandboxPool, "execute_batch", autospec=True) as mock_batch:
+                mock_batch.side_effect = slow_batch
+                accepted = [asyncio.create_task(run()) for _ in range(4)]
+                await asyncio.sleep(0.1)
+                assert peak == 2
+
+                # Both consumers hold a batch; the queue takes one more batch each
+                accepted += [asyncio.create_task(run()) for _ in range(4)]
+                await asyncio.sleep(0)
+                with pytest.raises(AgentBusyError):
+                    await run()
+
+                release.set()
+                results = await asyncio.gather(*accepted)
+
+            assert all(r["error"] is False for r in results)
+            assert peak == 2
+        finally:
+            await executor.shutdown()
+
+    async def test_least_recently_used_idle_pool_is_evicted(self, tmp_path):
+        """Should shut down the oldest idle pool once max_pools pools are warm."""
+        executor = SimpleExecutor(cache_dir=tmp_path, pool_size=1, max_pools=1)
+
+        async def run(dep_hash: str) -> dict:
+            return await executor.execute(
+                fn_pickle=cloudpickle.dumps(lambda: dep_hash),
+                args_pickle=cloudpickle.dumps(()),
+                kwargs_pickle=cloudpickle.dumps({}),
+                dependencies=[],
+                dep_hash=dep_hash,
+            )
+
+        try:
+            await run("a")
+            await run("a")
+            first = executor.pools["a"]
+
+            result = await run("b")
+
+            assert msgpack.unpackb(result["result_msgpack"]) == "b"
+            assert list(executor.pools) == ["b"]
+            assert "a" not in executor._queues and "a" not in executor._consumer_tasks
+            assert not first.workers
+            assert (executor.pool_hits, executor.pool_misses, executor.pool_evictions) == (1, 2, 1)
+        finally:
+            await executor.shutdown()
+
+    async def test_concurrent_first_requests_share_one_pool(self, tmp_path):
+        """Should start one pool for a new dependency set no matter how many requests need it."""
+        executor = SimpleExecutor(cache_dir=tmp_path, pool_size=1)
+
+        try:
+            with patch.object(
+                WarmSandboxPool, "start", autospec=True, side_effect=WarmSandboxPool.start
+            ) as mock_start:
+                pools = await asyncio.gather(
+                    *(executor._ensure_pool("none", None) for _ in range(10))
+                )
+
+            assert mock_start.call_count == 1
+            assert len({id(p) for p in pools}) == 1
+            assert list(executor.pools) == ["none"] and not executor._pool_starts
+            assert executor.pool_misses == 1
+        finally:
+            await executor.shutdown()
+
+    async def test_shutdown_stops_a_bounded_number_of_pools_at_once(self, tmp_path, monkeypatch):
+        """Should stop every pool, at most POOL_SHUTDOWN_CONCURRENCY at a time."""
+        monkeypatch.setattr(simple_agent, "POOL_SHUTDOWN_CONCURRENCY", 2)
+        executor = SimpleExecutor(cache_dir=tmp_path)
+        stopped = []
+        in_flight = peak = 0
+
+        async def slow_shutdown(pool):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            stopped.append(pool)
+            if len(stopped) == 1:
+                raise RuntimeError("worker would not exit")
+
+        pools = [WarmSandboxPool(pool_size=0) for _ in range(5)]
+        executor.pools.update((str(i), pool) for i, pool in enumerate(pools))
+
+        with patch.object(WarmSandboxPool, "shutdown", autospec=True, side_effect=slow_shutdown):
+            await executor.shutdown()
+
+        assert sorted(map(id, stopped)) == sorted(map(id, pools))
+        assert peak == 2
+
+    async def test_concurrent_first_requests_share_one_venv_build(self, tmp_path):
+        """Should build a new venv once no matter how many requests need it."""
+        executor = SimpleExecutor(cache_dir=tmp_path)
+        builds = 0
+
+        async def fake_build(dep_hash: str, dependencies: list[str], no_cache: bool = False):
+            nonlocal builds
+            builds += 1
+            await asyncio.sleep(0.01)
+            return tmp_path / f"venv-{dep_hash}"
+
+        with patch.object(executor, "_build_venv", side_effect=fake_build):
+            paths = await asyncio.gather(
+                *(executor._ensure_venv("abc", ["numpy"]) for _ in range(10))
+            )
+
+        assert builds == 1
+        assert set(paths) == {tmp_path / "venv-abc"}
+
+    async def test_failed_venv_build_is_retried(self, tmp_path):
+        """Should report a failed build to every waiter and retry on the next request."""
+        executor = SimpleExecutor(cache_dir=tmp_path)
+
+        with patch.object(executor, "_build_venv", side_effect=RuntimeError("uv failed")):
+            results = await asyncio.gather(
+                *(executor._ensure_venv("abc", ["numpy"]) for _ in range(3)),
+                return_exceptions=True,
+            )
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert "abc" not in executor.dep_envs
+
+        with patch.object(executor, "_build_venv", return_value=tmp_path / "venv-abc"):
+            assert await executor._ensure_venv("abc", ["numpy"]) == tmp_path / "venv-abc"
+
+    async def test_failed_install_leaves_no_venv_behind(self, tmp_path, fake_uv):
+        """Should not reuse a venv whose package install failed."""
+        cache_dir = tmp_path / "cache"
+        executor = SimpleExecutor(cache_dir=cache_dir)
+        venv_path = cache_dir / f"venv-{VENV_PYTHON_TAG}-abc"
+
+        with pytest.raises(RuntimeError, match="no matching distribution"):
+            await executor._ensure_venv("abc", ["numpy"])
+        assert not venv_path.exists()
+
+        (tmp_path / "ok").touch()
+        assert await executor._ensure_venv("abc", ["numpy"]) == venv_path
+        assert (venv_path / VENV_COMPLETE_MARKER).exists()
+        assert (tmp_path / "uv.log").read_text().count("pip install") == 2
+
+    async def test_no_cache_install_skips_uv_cache(self, tmp_path, fake_uv):
+        """Should install without uv's package cache when the caller disabled caching."""
+        executor = SimpleExecutor(cache_dir=tmp_path / "cache")
+        (tmp_path / "ok").touch()
+
+        await executor._ensure_venv("cached", ["numpy"])
+        await executor._ensure_venv("fresh", ["numpy"], no_cache=True)
+
+        cached, fresh = (tmp_path / "uv.log").read_text().splitlines()
+        assert "--cache-dir" in cached and "--no-cache" not in cached
+        assert "--no-cache" in fresh and "--cache-dir" not in fresh
+        assert "--compile-bytecode" in cached and "--compile-bytecode" in fresh
+
+    async def test_no_cache_venvs_are_pruned(self, tmp_path, fake_uv):
+        """Should drop venvs that can never be reused when the cache is pruned."""
+        executor = SimpleExecutor(cache_dir=tmp_path / "cache")
+        (tmp_path / "ok").touch()
+
+        kept = await executor._ensure_venv("cached", ["numpy"])
+        fresh = await executor._ensure_venv("fresh", ["numpy"], no_cache=True)
+        broken = executor.cache_dir / f"venv-{VENV_PYTHON_TAG}-broken"
+        (broken / "bin").mkdir(parents=True)
+        # Complete, but built before an image rebuild changed the Python version
+        stale = executor.cache_dir / "venv-py2.7-cached"
+        stale.mkdir()
+        (stale / VENV_COMPLETE_MARKER).touch()
+
+        assert fresh.name.startswith(NO_CACHE_VENV_PREFIX)
+        executor.prune_cache()
+
+        assert [p.name for p in executor.cache_dir.glob("venv-*")] == [kept.name]
+        assert "cache prune" in (tmp_path / "uv.log").read_text()
+
+
+class TestExecuteEndpoint:
+    """Tests for the agent's HTTP /execute endpoint."""
+
+    async def test_returns_msgpack_results_and_errors(self, tmp_path, monkeypatch):
+        """Should answer every request with its own msgpack document, errors included."""
+        executor = SimpleExecutor(cache_dir=tmp_path, pool_size=1)
+        monkeypatch.setattr(simple_agent, "executor", executor)
+        payload = {
+            "fn_pickle": cloudpickle.dumps(lambda v: v * 2),
+            "args_pickle": cloudpickle.dumps((21,)),
+            "kwargs_pickle": cloudpickle.dumps({}),
+        }
+
+        transport = httpx.ASGITransport(app=simple_agent.app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://agent") as client:
+                ok = await client.post("/execute", content=msgpack.packb(payload))
+                bad = await client.post("/execute", content=msgpack.packb({"fn_pickle": b""}))
+                again = await client.post("/execute", content=msgpack.packb(payload))
+                empty = await client.post("/execute", content=b"")
+
+                async def in_chunks(body: bytes):
+                    for i in range(0, len(body), 7):
+                        yield body[i : i + 7]
+
+                chunked = await client.post("/execute", content=in_chunks(msgpack.packb(payload)))
+        finally:
+            await executor.shutdown()
+
+        assert msgpack.unpackb(msgpack.unpackb(ok.content)["result_msgpack"]) == 42
+        assert msgpack.unpackb(bad.content)["error_type"] == "KeyError"
+        assert msgpack.unpackb(again.content) == msgpack.unpackb(ok.content)
+        assert msgpack.unpackb(empty.content)["error_type"] == "OutOfData"
+        assert msgpack.unpackb(chunked.content) == msgpack.unpackb(ok.content)
+
+    async def test_reads_bodies_over_default_unpacker_limit(self):
+        """Should decode request bodies larger than msgpack's default 100 MiB buffer."""
+        body = msgpack.packb({"fn_pickle": bytes(101 * 1024 * 1024)})
+
+        class StreamedRequest:
+            async def stream(self):
+                view = memoryview(body)
+                for i in range(0, len(view), 1024 * 1024):
+                    yield view[i : i + 1024 * 1024]
+
+        data = await simple_agent._read_msgpack(StreamedRequest())
+
+        assert len(data["fn_pickle"]) == 101 * 1024 * 1024
+
+
+class TestExecuteBatchEndpoint:
+    """Tests for the agent's HTTP /execute_batch endpoint."""
+
+    async def test_returns_results_in_job_order(self, tmp_path, monkeypatch):
+        """Should run every job and answer with one result per job, failures included."""
+        executor = SimpleExecutor(cache_dir=tmp_path, pool_size=2)
+        monkeypatch.setattr(simple_agent, "executor", executor)
+
+        def job(fn, *args, dep_hash: str = "none") -> dict:
+            return {
+                "fn_pickle": cloudpickle.dumps(fn),
+                "args_pickle": cloudpickle.dumps(args),
+                "kwargs_pickle": cloudpickle.dumps({}),
+                "dep_hash": dep_hash,
+            }
+
+        jobs = [job(lambda v: v * 2, x, dep_hash=f"set-{x % 2}") for x in range(6)]
+        jobs.insert(2, {"fn_pickle": b""})
+
+        transport = httpx.ASGITransport(app=simple_agent.app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://agent") as client:
+                response = await client.post(
+                    "/execute_batch", content=msgpack.packb({"jobs": jobs})
+                )
+                bad = await client.post("/execute_batch", content=msgpack.packb({}))
+        finally:
+            await executor.shutdown()
+
+        results = msgpack.unpackb(response.content)["results"]
+        assert results[2]["error_type"] == "KeyError"
+        del results[2]
+        assert [msgpack.unpackb(r["result_msgpack"]) for r in results] == [0, 2, 4, 6, 8, 10]
+        assert msgpack.unpackb(bad.content)["error_type"] == "KeyError"
+
+    async def test_batch_larger_than_queue_is_not_refused(self, tmp_path, monkeypatch):
+        """Should queue a batch's jobs as slots free up instead of refusing the overflow."""
+        executor = SimpleExecutor(cache_dir=tmp_path, pool_size=1, max_batch=2)
+        monkeypatch.setattr(simple_agent, "executor", executor)
+        jobs = [
+            {
+                "fn_pickle": cloudpickle.dumps(lambda v: v + 1),
+                "args_pickle": cloudpickle.dumps((x,)),
+                "kwargs_pickle": cloudpickle.dumps({}),
+            }
+            for x in range(10)
+        ]
+
+        transport = httpx.ASGITransport(app=simple_agent.app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://agent") as client:
+                response = await client.post(
+                    "/execute_batch", content=msgpack.packb({"jobs": jobs})
+                )
+        finally:
+            await executor.shutdown()
+
+        assert executor.consumers * executor.max_batch < len(jobs)
+        results = msgpack.unpackb(response.content)["results"]
+        assert [msgpack.unpackb(r["result_msgpack"]) for r in results] == list(range(1, 11))
+
+
+class TestLifespan:
+    """Tests for the agent's startup and shutdown hooks."""
+
+    async def test_prewarms_pool_for_functions_without_dependencies(self, tmp_path, monkeypatch):
+        """Should start the dependency-free pool at startup and stop it at shutdown."""
+        executor = SimpleExecutor(cache_dir=tmp_path, pool_size=1)
+        monkeypatch.setattr(simple_agent, "executor", executor)
+        no_deps_hash = hashlib.sha256(b"").hexdigest()[:16]
+
+        async with simple_agent.lifespan(simple_agent.app):
+            pool = executor.pools[no_deps_hash]
+            assert len(pool.workers) == 1
+
+        assert not pool.workers
+
+
+class TestVersionEndpoint:
+    """Tests for the agent's HTTP /version endpoint."""
+
+    async def test_reports_hash_of_agent_sources(self):
+        """Should serve the source hash computed at import."""
+        transport = httpx.ASGITransport(app=simple_agent.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://agent") as client:
+            response = await client.get("/version")
+
+        assert response.json() == {"version": simple_agent._compute_agent_version()}
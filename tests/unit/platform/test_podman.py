@@ -1,6 +1,9 @@
 """Tests for Podman backend."""
 
-from unittest.mock import Mock, patch
+import json
+import os
+import subprocess
+from unittest.mock import MagicMock, Mock, patch
 
 import httpx
 import pytest
@@ -9,6 +12,21 @@ from pctx_sandbox.exceptions import SandboxStartupError
 from pctx_sandbox.platform.podman import PodmanBackend
 
 
+def _build_process(returncode: int, output: list[str] | None = None) -> MagicMock:
+    """Stand-in for the podman build Popen: yields output lines, then exits with returncode."""
+    process = MagicMock(returncode=returncode)
+    process.__enter__.return_value = process
+    process.stdout = iter(output or [])
+    return process
+
+
+@pytest.fixture(autouse=True)
+def cache_home(tmp_path, monkeypatch):
+    """Keep files the backend writes to the user's cache directory inside tmp_path."""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    return tmp_path
+
+
 class TestPodmanBackend:
     """Tests for PodmanBackend class."""
 
@@ -49,11 +67,11 @@ class TestPodmanBackend:
 
         with (
             patch("subprocess.run", return_value=mock_result),
-            patch("httpx.get") as mock_httpx_get,
+            patch("httpx.Client") as mock_client_class,
         ):
             mock_response = Mock()
             mock_response.status_code = 200
-            mock_httpx_get.return_value = mock_response
+            mock_client_class.return_value.get.return_value = mock_response
 
             assert backend.is_running() is True
 
@@ -76,8 +94,48 @@ class TestPodmanBackend:
 
         with (
             patch("subprocess.run", return_value=mock_result),
-            patch("httpx.get", side_effect=httpx.ConnectError("Connection refused")),
+            patch("httpx.Client") as mock_client_class,
         ):
+            mock_client_class.return_value.get.side_effect = httpx.ConnectError(
+                "Connection refused"
+            )
+            assert backend.is_running() is False
+
+    def test_is_running_reuses_probe_connection(self):
+        """Should open one kept-alive client on the first probe and reuse it after."""
+        mock_result = Mock()
+        mock_result.stdout = "abc123\n"
+        mock_result.returncode = 0
+
+        with (
+            patch("subprocess.run", return_value=mock_result),
+            patch("time.monotonic", return_value=float("inf")),
+            patch("httpx.Client") as mock_client_class,
+        ):
+            # Opened by the first probe, not when the backend is built
+            backend = PodmanBackend()
+            mock_client_class.assert_not_called()
+
+            get = mock_client_class.return_value.get
+            get.return_value = Mock(status_code=200)
+            assert backend.is_running() is True
+            assert backend.is_running() is True
+
+        mock_client_class.assert_called_once()
+        assert [c.args for c in get.call_args_list] == [(f"{backend.agent_url}/health",)] * 2
+
+    def test_is_running_when_probe_connection_went_stale(self):
+        """Should report not running when the kept-alive connection was dropped by the agent."""
+        backend = PodmanBackend()
+        mock_result = Mock()
+        mock_result.stdout = "abc123\n"
+        mock_result.returncode = 0
+
+        with (
+            patch("subprocess.run", return_value=mock_result),
+            patch("httpx.Client") as mock_client_class,
+        ):
+            mock_client_class.return_value.get.side_effect = httpx.RemoteProtocolError("closed")
             assert backend.is_running() is False
 
     def test_ensure_running_does_nothing_when_already_running(self):
@@ -116,30 +174,42 @@ class TestPodmanBackend:
 
         # Mock image check (no image)
         mock_check_result = Mock()
-        mock_check_result.stdout = ""
-        mock_check_result.returncode = 0
-
-        # Mock build success
-        mock_build_result = Mock()
-        mock_build_result.returncode = 0
+        mock_check_result.returncode = 1
 
-        with patch(
-            "subprocess.run", side_effect=[mock_check_result, mock_build_result]
-        ) as mock_run:
+        with (
+            patch("subprocess.run", return_value=mock_check_result),
+            patch("subprocess.Popen", return_value=_build_process(0)) as mock_popen,
+        ):
             backend._ensure_image()
 
             # Should call podman build
-            build_call = mock_run.call_args_list[1]
+            build_call = mock_popen.call_args
             assert "podman" in build_call[0][0]
             assert "build" in build_call[0][0]
 
+    def test_ensure_image_reports_end_of_failed_build_log(self):
+        """Should raise with the last lines of the build output when the build fails."""
+        backend = PodmanBackend()
+        mock_check_result = Mock(returncode=1)
+        log = [f"STEP {i}\n" for i in range(1000)] + ["Error: no space left on device\n"]
+
+        with (
+            patch("subprocess.run", return_value=mock_check_result),
+            patch("subprocess.Popen", return_value=_build_process(125, log)),
+        ):
+            with pytest.raises(SandboxStartupError, match="no space left") as exc_info:
+                backend._ensure_image()
+
+        assert "exit code 125" in str(exc_info.value)
+        assert "STEP 999" in str(exc_info.value) and "STEP 0\n" not in str(exc_info.value)
+        assert not backend._image_ready
+
     def test_ensure_image_skips_when_exists(self):
         """Should skip build when image already exists."""
         backend = PodmanBackend()
 
         # Mock image check (image exists)
         mock_result = Mock()
-        mock_result.stdout = "abc123\n"
         mock_result.returncode = 0
 
         with patch("subprocess.run", return_value=mock_result) as mock_run:
@@ -147,6 +217,50 @@ class TestPodmanBackend:
 
             # Should only check, not build
             assert mock_run.call_count == 1
+            assert mock_run.call_args[0][0] == ["podman", "image", "exists", backend.IMAGE_NAME]
+
+    def test_ensure_image_checks_once_until_destroyed(self):
+        """Should remember that the image exists until destroy removes it."""
+        backend = PodmanBackend()
+        mock_result = Mock()
+        mock_result.returncode = 0
+
+        with patch("subprocess.run", return_value=mock_result) as mock_run:
+            backend._ensure_image()
+            backend._ensure_image()
+            assert mock_run.call_count == 1
+
+            backend.destroy()
+            mock_run.reset_mock()
+            backend._ensure_image()
+            assert mock_run.call_count == 1
+
+    def test_is_running_trusts_a_healthy_answer_briefly(self):
+        """Should skip podman for a moment after a healthy check, but not after stop."""
+        backend = PodmanBackend()
+        mock_result = Mock()
+        mock_result.stdout = "abc123\n"
+        mock_result.returncode = 0
+
+        with (
+            patch("subprocess.run", return_value=mock_result) as mock_run,
+            patch("httpx.Client") as mock_client_class,
+        ):
+            mock_get = mock_client_class.return_value.get
+            mock_get.return_value = Mock(status_code=200)
+            assert backend.is_running() is True
+            assert backend.is_running() is True
+            assert (mock_run.call_count, mock_get.call_count) == (1, 1)
+
+            backend.stop()
+            mock_run.reset_mock()
+            assert backend.is_running() is True
+            assert mock_run.call_count == 1
+
+            with patch("time.monotonic", return_value=float("inf")):
+                mock_run.reset_mock()
+                assert backend.is_running() is True
+                assert mock_run.call_count == 1
 
     def test_ensure_image_raises_when_dockerfile_not_found(self):
         """Should raise SandboxStartupError when Dockerfile doesn't exist."""
@@ -154,8 +268,7 @@ class TestPodmanBackend:
 
         # Mock image check (no image)
         mock_check_result = Mock()
-        mock_check_result.stdout = ""
-        mock_check_result.returncode = 0
+        mock_check_result.returncode = 1
 
         with (
             patch("subprocess.run", return_value=mock_check_result),
@@ -193,6 +306,61 @@ class TestPodmanBackend:
             assert "4" in cmd
             assert "-p" in cmd
             assert "9000:9000" in cmd
+            assert "-v" in cmd
+            assert f"{backend.CACHE_VOLUME}:/tmp/pctx-cache" in cmd
+            # The sandbox user keeps one subordinate id, so the volume is never re-chowned
+            assert "--userns=auto:uidmapping=1000:1000:1,gidmapping=1000:1000:1" in cmd
+
+    def test_start_container_probes_cgroup_controllers_once(self):
+        """Should reuse the cgroup probe's answer when starting the container again."""
+        backend = PodmanBackend()
+
+        with patch("subprocess.run", return_value=Mock(returncode=0)) as mock_run:
+            backend._start_container()
+            backend._start_container()
+
+        commands = [call.args[0] for call in mock_run.call_args_list]
+        assert sum("alpine:latest" in cmd for cmd in commands) == 1
+        assert all("--memory" in cmd for cmd in commands if "-d" in cmd)
+
+    def test_build_and_run_share_one_empty_authfile(self, cache_home):
+        """Should write the empty auth file once and pass it to every podman command."""
+        backend = PodmanBackend()
+        mock_missing = Mock(returncode=1)
+
+        with (
+            patch("subprocess.run", return_value=mock_missing) as mock_run,
+            patch("subprocess.Popen", return_value=_build_process(0)) as mock_popen,
+            patch("os.replace", wraps=os.replace) as write,
+        ):
+            backend._ensure_image()
+            backend._start_container()
+            backend._start_container()
+
+        build = " ".join(mock_popen.call_args.args[0])
+        run = " ".join(mock_run.call_args.args[0])
+
+        authfile = cache_home / "pctx-sandbox" / "empty-auth.json"
+        assert json.loads(authfile.read_text()) == {"auths": {}}
+        assert f"--authfile={authfile}" in build and f"--authfile={authfile}" in run
+        assert write.call_count == 1
+
+    def test_authfile_writers_use_their_own_temp_files(self, cache_home):
+        """Should never have two writers in one process share a temp file."""
+        backend = PodmanBackend()
+
+        # Each call acts like a thread that also found the auth file missing
+        with (
+            patch("pathlib.Path.exists", return_value=False),
+            patch("os.replace", wraps=os.replace) as replace,
+        ):
+            backend._authfile()
+            backend._authfile()
+
+        temp_files = [call.args[0] for call in replace.call_args_list]
+        assert len(set(temp_files)) == 2
+        authfile = cache_home / "pctx-sandbox" / "empty-auth.json"
+        assert os.listdir(authfile.parent) == [authfile.name]
 
     def test_stop_stops_container(self):
         """Should stop the container."""
@@ -223,3 +391,31 @@ class TestPodmanBackend:
             calls = [str(call[0][0]) for call in mock_run.call_args_list]
             assert any("rm" in call for call in calls)
             assert any("rmi" in call for call in calls)
+            assert any("volume" in call and backend.CACHE_VOLUME in call for call in calls)
+
+    def test_destroy_removes_container_before_image_and_volume(self):
+        """Should remove the container first, since the image and volume are in use until then."""
+        backend = PodmanBackend()
+
+        with patch("subprocess.run") as mock_run:
+            backend.destroy()
+
+        commands = [call.args[0] for call in mock_run.call_args_list]
+        assert commands[0] == ["podman", "rm", "-f", backend.CONTAINER_NAME]
+        assert sorted(commands[1:]) == [
+            ["podman", "rmi", "-f", backend.IMAGE_NAME],
+            ["podman", "volume", "rm", "-f", backend.CACHE_VOLUME],
+        ]
+
+    def test_discarded_output_is_not_captured(self):
+        """Should send output nobody reads to /dev/null rather than buffer it."""
+        backend = PodmanBackend()
+
+        with patch("subprocess.run") as mock_run:
+            backend.stop()
+            backend.destroy()
+
+        for call in mock_run.call_args_list:
+            assert "capture_output" not in call.kwargs
+            assert call.kwargs["stdout"] is subprocess.DEVNULL
+            assert call.kwargs["stderr"] is subprocess.DEVNULL
@@ -1,6 +1,7 @@
 """Tests for SandboxClient."""
 
-from unittest.mock import Mock, patch
+import asyncio
+from unittest.mock import AsyncMock, Mock, patch
 
 import httpx
 import msgpack
@@ -48,10 +49,16 @@ class TestSandboxClient:
                 raise httpx.ConnectError("Connection refused")
             return mock_response
 
-        with patch.object(client._http, "get", side_effect=side_effect), patch("time.sleep"):
+        with (
+            patch.object(client._http, "get", side_effect=side_effect),
+            patch("time.sleep") as mock_sleep,
+        ):
             client.wait_for_healthy(max_wait=5)
             assert call_count == 3
 
+        # Probes start fast and back off
+        assert [c.args[0] for c in mock_sleep.call_args_list] == [0.01, 0.02]
+
     def test_wait_for_healthy_raises_on_timeout(self):
         """Should raise SandboxStartupError after max_wait."""
         client = SandboxClient("http://localhost:9000")
@@ -88,6 +95,55 @@ class TestSandboxClient:
 
             assert result == {"success": True, "result_pickle": b"result"}
 
+    def test_execute_retries_when_agent_busy(self):
+        """Should back off and retry when the agent refuses a job as busy."""
+        client = SandboxClient("http://localhost:9000")
+
+        busy = Mock(status_code=503)
+        busy.content = msgpack.packb({"error": True, "error_type": "AgentBusy"})
+        ok = Mock(status_code=200)
+        ok.content = msgpack.packb({"error": False, "result_msgpack": b"\x01"})
+
+        with (
+            patch.object(client._http, "post", side_effect=[busy, ok]) as mock_post,
+            patch("time.sleep") as mock_sleep,
+        ):
+            result = client.execute({"fn_pickle": b"test"})
+
+        assert result == {"error": False, "result_msgpack": b"\x01"}
+        assert mock_post.call_count == 2
+        mock_sleep.assert_called_once()
+
+    def test_execute_many_resends_only_retryable_jobs(self):
+        """Should send all jobs in one request and retry just the ones refused as busy."""
+        client = SandboxClient("http://localhost:9000")
+        payloads = [
+            {"fn_pickle": b"a"},
+            {"fn_pickle": b"b", "timeout_sec": 10},
+            {"fn_pickle": b"c"},
+        ]
+        busy = {"error": True, "error_type": "AgentBusy"}
+        failed = {"error": True, "error_type": "ValueError"}
+
+        first = Mock()
+        first.content = msgpack.packb({"results": [{"error": False, "n": 1}, busy, failed]})
+        second = Mock()
+        second.content = msgpack.packb({"results": [{"error": False, "n": 2}]})
+
+        with (
+            patch.object(client._http, "post", side_effect=[first, second]) as mock_post,
+            patch("time.sleep") as mock_sleep,
+        ):
+            results = client.execute_many(payloads)
+
+        assert results == [{"error": False, "n": 1}, {"error": False, "n": 2}, failed]
+        (url,), sent = mock_post.call_args_list[0]
+        assert url == "http://localhost:9000/execute_batch"
+        assert msgpack.unpackb(sent["content"]) == {"jobs": payloads}
+        assert sent["timeout"] == 30 + 10 + 30 + 5
+        assert msgpack.unpackb(mock_post.call_args_list[1][1]["content"]) == {"jobs": [payloads[1]]}
+        mock_sleep.assert_called_once()
+
     def test_execute_with_custom_timeout(self):
         """Should use payload timeout plus buffer."""
         client = SandboxClient("http://localhost:9000")
@@ -127,41 +183,52 @@ class TestSandboxClient:
         mock_response = Mock()
         mock_response.content = msgpack.packb({"success": True, "result_pickle": b"result"})
 
-        # Mock AsyncClient as context manager
-        class MockAsyncClient:
-            async def __aenter__(self):
-                return self
-
-            async def __aexit__(self, exc_type, exc_val, exc_tb):
-                pass
+        mock_async_client = Mock()
+        mock_async_client.post = AsyncMock(return_value=mock_response)
 
-            async def post(self, *args, **kwargs):
-                return mock_response
-
-        with patch("httpx.AsyncClient", return_value=MockAsyncClient()):
+        with patch("httpx.AsyncClient", return_value=mock_async_client):
             result = await client.execute_async(payload)
             assert result == {"success": True, "result_pickle": b"result"}
 
+        call_args = mock_async_client.post.call_args
+        assert call_args[0][0] == "http://localhost:9000/execute"
+        assert msgpack.unpackb(call_args[1]["content"]) == payload
+
     @pytest.mark.asyncio
-    async def test_execute_async_creates_new_client(self):
-        """Should create new async http client for each request."""
+    async def test_execute_async_reuses_client(self):
+        """Should reuse one async http client across requests on the same loop."""
         client = SandboxClient("http://localhost:9000")
 
         mock_response = Mock()
         mock_response.content = msgpack.packb({"success": True})
+        mock_async_client = Mock()
+        mock_async_client.post = AsyncMock(return_value=mock_response)
+        mock_async_client.aclose = AsyncMock()
 
-        class MockAsyncClient:
-            async def __aenter__(self):
-                return self
+        with patch("httpx.AsyncClient", return_value=mock_async_client) as mock_client_class:
+            await client.execute_async({"fn_pickle": b"test"})
+            await client.execute_async({"fn_pickle": b"test"})
 
-            async def __aexit__(self, exc_type, exc_val, exc_tb):
-                pass
+            mock_client_class.assert_called_once()
+            assert mock_async_client.post.call_count == 2
 
-            async def post(self, *args, **kwargs):
-                return mock_response
+        await client.aclose()
+        mock_async_client.aclose.assert_awaited_once()
 
-        with patch("httpx.AsyncClient", return_value=MockAsyncClient()) as mock_client_class:
-            await client.execute_async({"fn_pickle": b"test"})
+    def test_execute_async_new_client_per_event_loop(self):
+        """Should not reuse an async client across event loops."""
+        client = SandboxClient("http://localhost:9000")
 
-            # AsyncClient should be created for the request
-            mock_client_class.assert_called_once()
+        mock_response = Mock()
+        mock_response.content = msgpack.packb({"success": True})
+
+        def make_client(**kwargs):
+            mock_async_client = Mock()
+            mock_async_client.post = AsyncMock(return_value=mock_response)
+            return mock_async_client
+
+        with patch("httpx.AsyncClient", side_effect=make_client) as mock_client_class:
+            asyncio.run(client.execute_async({"fn_pickle": b"test"}))
+            asyncio.run(client.execute_async({"fn_pickle": b"test"}))
+
+        assert mock_client_class.call_count == 2
@@ -1,14 +1,20 @@
 """Tests for sandbox decorator."""
 
 import hashlib
+import sys
 from unittest.mock import Mock, patch
 
 import cloudpickle
+import msgpack
 import pytest
 
 from pctx_sandbox.decorator import _get_client, sandbox, sandbox_async
 from pctx_sandbox.exceptions import SandboxExecutionError
 
+# Module globals read by sandboxed functions in the pickle cache tests
+LIMIT = 1
+SEEN: list[int] = []
+
 
 class TestGetClient:
     """Tests for _get_client function."""
@@ -138,6 +144,22 @@ class TestSandboxDecorator:
             # Result should be deserialized
             assert result == 42
 
+    def test_msgpack_result_is_decoded(self):
+        """Should decode plain-data results sent as msgpack."""
+        mock_client = Mock()
+        mock_client.execute.return_value = {
+            "error": False,
+            "result_msgpack": msgpack.packb({"rows": [1, 2]}),
+        }
+
+        with patch("pctx_sandbox.decorator._get_client", return_value=mock_client):
+
+            @sandbox()
+            def rows() -> dict:
+                return {"rows": [1, 2]}
+
+            assert rows() == {"rows": [1, 2]}
+
     def test_function_execution_with_kwargs(self):
         """Should handle keyword arguments correctly."""
         mock_client = Mock()
@@ -158,6 +180,125 @@ class TestSandboxDecorator:
             kwargs = cloudpickle.loads(payload["kwargs_pickle"])
             assert kwargs == {"greeting": "Hi"}
 
+    def test_function_pickled_once_across_calls(self):
+        """Should serialize the function once and reuse the bytes on later calls."""
+        mock_client = Mock()
+        mock_client.execute.return_value = {
+            "success": True,
+            "result_pickle": cloudpickle.dumps(None),
+        }
+
+        with patch("pctx_sandbox.decorator._get_client", return_value=mock_client):
+
+            @sandbox()
+            def task(x: int) -> None:
+                pass
+
+            with patch(
+                "pctx_sandbox.decorator.cloudpickle.dumps", wraps=cloudpickle.dumps
+            ) as mock_dumps:
+                task(1)
+                task(2)
+
+            pickled = [c.args[0] for c in mock_dumps.call_args_list]
+            assert sum(callable(obj) for obj in pickled) == 1
+
+            first, second = (c.args[0] for c in mock_client.execute.call_args_list)
+            assert first["fn_pickle"] is second["fn_pickle"]
+            assert cloudpickle.loads(second["args_pickle"]) == (2,)
+
+    def test_function_repickled_when_captured_globals_change(self):
+        """Should not reuse a pickle that froze a global which has since changed."""
+        global LIMIT
+        mock_client = Mock()
+        mock_client.execute.return_value = {
+            "success": True,
+            "result_pickle": cloudpickle.dumps(None),
+        }
+
+        with patch("pctx_sandbox.decorator._get_client", return_value=mock_client):
+
+            @sandbox()
+            def limit() -> int:
+                return LIMIT
+
+            @sandbox()
+            def seen() -> int:
+                return len(SEEN)
+
+            try:
+                limit()
+                LIMIT = 2
+                limit()
+                seen()
+                SEEN.append(1)
+                seen()
+            finally:
+                LIMIT = 1
+                SEEN.clear()
+
+        pickles = [c.args[0]["fn_pickle"] for c in mock_client.execute.call_args_list]
+        assert [cloudpickle.loads(p)() for p in pickles] == [1, 2, 0, 1]
+
+    def test_empty_call_arguments_not_repickled(self):
+        """Should reuse precomputed pickles for calls without arguments."""
+        mock_client = Mock()
+        mock_client.execute.return_value = {
+            "success": True,
+            "result_pickle": cloudpickle.dumps(None),
+        }
+
+        with patch("pctx_sandbox.decorator._get_client", return_value=mock_client):
+
+            @sandbox()
+            def task() -> None:
+                pass
+
+            task()
+            with patch("pctx_sandbox.decorator.cloudpickle.dumps") as mock_dumps:
+                task()
+
+            mock_dumps.assert_not_called()
+            payload = mock_client.execute.call_args[0][0]
+            assert cloudpickle.loads(payload["args_pickle"]) == ()
+            assert cloudpickle.loads(payload["kwargs_pickle"]) == {}
+
+    def test_plain_arguments_skip_cloudpickle(self, monkeypatch):
+        """Should pickle plain arguments with the stdlib and fall back for the rest."""
+        mock_client = Mock()
+        mock_client.execute.return_value = {
+            "success": True,
+            "result_pickle": cloudpickle.dumps(None),
+        }
+
+        class Point:
+            pass
+
+        # Importable from __main__ on this side only, like a class defined in a script
+        Point.__module__ = "__main__"
+        Point.__qualname__ = "Point"
+        monkeypatch.setattr(sys.modules["__main__"], "Point", Point, raising=False)
+
+        with patch("pctx_sandbox.decorator._get_client", return_value=mock_client):
+
+            @sandbox()
+            def task(*args, **kwargs) -> None:
+                pass
+
+            with patch(
+                "pctx_sandbox.decorator.cloudpickle.dumps", wraps=cloudpickle.dumps
+            ) as mock_dumps:
+                task(1, [2.5, "x"], key={"a": b"b"})
+                assert mock_dumps.call_count == 1  # The function itself
+
+                task(lambda: None)
+                task(Point())
+                assert mock_dumps.call_count == 3
+
+        payload = mock_client.execute.call_args_list[0][0][0]
+        assert cloudpickle.loads(payload["args_pickle"]) == (1, [2.5, "x"])
+        assert cloudpickle.loads(payload["kwargs_pickle"]) == {"key": {"a": b"b"}}
+
     def test_dependency_hash_generation(self):
         """Should generate consistent dependency hash."""
 